@@ -1,34 +1,158 @@
 from puzzle import *
-from queue import PriorityQueue
+from state_table import StateTable
+from search_stats import NO_STATS
+from time import perf_counter_ns, perf_counter
+import heapq
+from array import array
 
 class Solver:
     """
-    A class to implement three different search algorithms to solve an 8-puzzle
+    A class to implement different search algorithms to solve an 8-puzzle (or a bigger sliding puzzle, see Puzzle and Board). The algorithms are:
+        "UCS": Uniform Cost Search
+        "BFS": Best-first Search using the Manhattan distance
+        "A": A* Search using the Nilsson's sequence score
+        "PDB": A* Search using a pattern database (see PatternDatabase). When the database is additive this always finds the shortest solution, and it visits way fewer nodes than the Manhattan distance or Nilsson's sequence.
+        "IDA": Iterative Deepening A* using the Manhattan distance. Instead of keeping a queue of every node it has seen, it does a depth-first search that gives up on any node whose cost goes over a bound, and raises the bound each time it fails. This means it only ever needs to remember the current path, so the memory it uses only grows with the solution depth.
+        "BIDI": Bidirectional Uniform Cost Search. It searches forwards from the scramble and backwards from the solved state at the same time, one layer at a time, and stops when the two searches meet. Each search only has to go about half as deep, so it visits roughly 2*b^(d/2) nodes instead of b^d.
+        "TABLE": No search at all. It just follows the best moves stored in a StateTable, which has the shortest solution for every state of the board. Only works for boards up to 3x3.
+        "WA": Weighted A* Search using the Manhattan distance times a weight (cost = depth + weight*manhattan). Trusting the heuristic more makes it head for the solution a lot faster, and since the Manhattan distance never overestimates, the solution is never more than weight times longer than the shortest one.
+        "ARA": Anytime Repairing A* (ARA*). It starts out as Weighted A* to find a solution fast, then keeps lowering the weight and fixing up the search it already did (instead of starting over) to find better ones, until it proves the solution is the shortest or it runs out of time or nodes. After each solve, bound says how far from the shortest solution it could still be.
     """
 
-    def __init__(self,alg="UCS"):
-        self.puzzle = Puzzle() # Puzzle object used to calculate valid moves, cost calculations, etc.
-        self.visited = [] # List of visited nodes
-        self.open = PriorityQueue() # Priority queue of nodes to visit
-        self.alg = alg # Specifies which of the three algorithms to use
-        self.past_positions = set() # Keep track of puzzle positions that have been visited to avoid looping
+    def __init__(self,alg="UCS",rows=3,cols=None,layout="spiral",pdb=None,table=None,compact_closed=False,cache=None,stats=None,trace=True,weight=2.0,weight_step=0.5,time_limit=None,node_limit=None):
+        """Initializes a Solver object
+
+        Args:
+            alg (str): Which algorithm to use (see above)
+            rows (int): Number of rows on the board
+            cols (int): Number of columns on the board. Defaults to the same as rows.
+            layout (str): How positions are numbered, either "spiral" or "row" (see Board)
+            pdb (PatternDatabase or str): Pattern database for the "PDB" algorithm, or the directory it was saved to. If it isn't given, one gets built using the default patterns.
+            table (StateTable or str): State table for the "TABLE" algorithm, or the file it's cached in. If it isn't given, it gets loaded from (or built and saved to) StateTable.file_name() in the current directory.
+            compact_closed (bool): Whether to keep track of past positions with a ClosedSet instead of a dictionary when the board is small enough for one. It uses about half the memory on a long UCS search, but ranking every position in Python makes it roughly 2x slower, so it's off by default.
+            cache (SolveCache): Optional cache to look solutions up in before searching and save them to after. It can be shared between solvers since solutions are kept separate by algorithm (and by weight and limits for "WA" and "ARA", see cache_key()). The bound gets saved along with the solution. Only algorithms that always find the shortest solution share solutions between rotated/reflected copies of a scramble (see is_optimal()).
+            stats (SearchStats): Optional SearchStats to collect numbers about each search in (nodes generated, duplicates pruned, time per phase, etc.). Without one the search skips all the bookkeeping.
+            trace (bool): Whether to write the solution of each solve to the trace log (see trace_log.py). Nothing gets written unless the trace log was started anyway.
+            weight (float): Weight on the Manhattan distance for "WA", and the starting weight for "ARA". It has to be at least 1.
+            weight_step (float): How much "ARA" lowers the weight after each solution it finds
+            time_limit (float): Seconds "ARA" gets to improve its solution. It always keeps going until it has at least one solution though.
+            node_limit (int): Number of nodes "ARA" can expand to improve its solution. Like time_limit, it only stops once it has a solution.
+        """
+        if weight < 1:
+            raise Exception("The weight can't be less than 1, since that's just A* trusting the heuristic less")
+        self.puzzle = Puzzle(rows=rows,cols=cols,layout=layout) # Puzzle object used to calculate valid moves, cost calculations, etc.
+        self.pdb = None
+        if alg == "PDB":
+            from pattern_db import PatternDatabase # Only imported here since it needs numpy, which takes longer to import than everything else put together
+            if pdb is None:
+                pdb = PatternDatabase.build(self.puzzle.board)
+            elif isinstance(pdb,str):
+                pdb = PatternDatabase.load(pdb)
+            if pdb.board is not self.puzzle.board:
+                raise Exception("The pattern database was built for a different board")
+            self.pdb = pdb
+        self.table = None
+        if alg == "TABLE":
+            if not isinstance(table,StateTable):
+                table = StateTable.load_or_build(self.puzzle.board,table)
+            if table.board is not self.puzzle.board:
+                raise Exception("The state table was built for a different board")
+            self.table = table
+        self.nodes = NodeArena(self.puzzle.board) # Every node the search has created
+        self.visited = array("I") # Indices (in self.nodes) of visited nodes (IDA doesn't keep these since that would defeat the point)
+        self.open = OpenList() # Priority queue of nodes to visit
+        self.alg = alg # Specifies which of the algorithms to use
+        self.compact_closed = compact_closed
+        self.past_positions = self.new_closed_set() # Keep track of puzzle positions (as packed integers) that have been visited to avoid looping, along with the lowest depth we've reached them at
         self.found_solution = False
+        self.solution = "" # Move sequence that solves the puzzle once it's found
+        self.nodes_expanded = 0 # Number of nodes visited while solving the puzzle
+        self.iteration_counts = [] # Number of nodes IDA visited in each iteration
+        self.cache = cache
+        self.stats = stats
+        self.trace = trace
+        self.weight = weight
+        self.weight_step = weight_step
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.bound = None # How many times longer than the shortest solution the solution could be ("WA" and "ARA" only). 1 means it's the shortest.
+        self.improvements = [] # (seconds since the search started, solution length, bound) for each solution "ARA" found
+        self.deadline = None # When "ARA" has to stop improving its solution (from perf_counter())
 
-    def solve(self,initial_position):
-        """Runs the algorithm to solve the puzzle state given by initial_position string"""
+    def solve(self,initial_position) -> str:
+        """Runs the algorithm to solve the puzzle state given by initial_position string and returns the move sequence that solves it"""
         self.reset()
-        self.puzzle.set_state(initial_position)
-        # logging.info(f"Now attempting to solve:\n{self.puzzle}")
+        with self.phase("setup"):
+            self.puzzle.set_state(initial_position) # This is the only place we validate the state since it came from the user
+            # logging.info(f"Now attempting to solve:\n{self.puzzle}")
+            if not(self.puzzle.is_solved()) and not(self.puzzle.is_solvable()):
+                raise Exception(f"The puzzle\n{self.puzzle}\ncannot be solved due to the inversion parity not matching the parity of the solved state.")
         if self.puzzle.is_solved():
+            return self.finish()
+        start = self.puzzle.get_state_int() # The search moves the puzzle around, so remember where it started
+        if self.cache is not None:
+            with self.phase("cache"):
+                cached = self.cache.lookup(self.cache_key(),self.puzzle.board,start,self.is_optimal())
+            if cached is not None: # Solved this one (or a rotated/reflected copy of it) before, so there's nothing to search
+                self.solution,self.bound = cached
+                return self.finish()
+        with self.phase("search"):
+            self.search()
+        if self.cache is not None:
+            with self.phase("cache"):
+                self.cache.put(self.cache_key(),self.puzzle.board,start,self.solution,self.bound,self.is_optimal())
+        return self.finish()
+
+    def is_optimal(self) -> bool:
+        """Returns true if the algorithm always finds the shortest solution. Only those get their cached solutions shared with rotated/reflected copies of the scramble (see SolveCache)."""
+        if self.alg == "WA":
+            return self.weight == 1
+        if self.alg == "ARA": # It only stops early when it runs out of time or nodes
+            return self.time_limit is None and self.node_limit is None
+        return self.alg in ["UCS","PDB","IDA","BIDI","TABLE"]
+
+    def cache_key(self) -> str:
+        """Returns what solutions are kept under in the cache. It's just the algorithm, except for "WA" and "ARA" where the weight (and the limits for "ARA") change which solution gets found."""
+        if self.alg == "WA":
+            return f"WA/{self.weight!r}"
+        if self.alg == "ARA":
+            return f"ARA/{self.weight!r}/{self.weight_step!r}/{self.time_limit!r}/{self.node_limit!r}"
+        return self.alg
+
+    def phase(self,name):
+        """Returns a context manager that times a phase of the solve if stats are being collected (and does nothing otherwise)"""
+        return self.stats.phase(name) if self.stats is not None else NO_STATS
+
+    def finish(self) -> str:
+        """Logs the solution, lets the stats know the solve is done (if there are any) and returns the solution"""
+        if self.trace and self.solution:
+            TRACE.info("Solution: %s",self.solution)
+        if self.stats is not None:
+            self.stats.finish()
+        return self.solution
+
+    def search(self):
+        """Runs the algorithm from the current state of the puzzle until it finds the solution (which ends up in self.solution)"""
+        if self.alg == "IDA": # IDA doesn't use the queue at all
+            self.solve_ida()
+            return
+        if self.alg == "BIDI": # BIDI has two searches, so it doesn't use the queue either
+            self.solve_bidirectional()
+            return
+        if self.alg == "TABLE": # Neither does TABLE, it just looks up the answer
+            self.solution = self.table.solve(self.puzzle)
             return
-        if not(self.puzzle.is_solvable()):
-            raise Exception(f"The puzzle\n{self.puzzle}\ncannot be solved due to the inversion parity not matching the parity of the solved state.")
+        if self.alg == "ARA": # ARA runs several searches and keeps the queue between them, so it has its own loop
+            self.solve_anytime()
+            return
+        if self.alg == "WA":
+            self.bound = self.weight
         # Add the first node
-        self.create_node(0)
+        self.create_node(self.puzzle.snapshot(),0,self.puzzle.get_empty_position())
 
         while not(self.open.empty()) and not(self.found_solution):
             # logging.info(f"{'~~|~~'*10}\n{self.open.qsize()} objects in queue\n")
-            # for i in self.open.queue[:5]:
+            # for i in self.open.heap[:5]:
             #     logging.info(f"\t{i}")
             self.expand()
 
@@ -36,111 +160,516 @@ class Solver:
         # logging.info(f"Solved puzzle:\n{self.puzzle}")
         # logging.info(f"Visited {len(self.visited)} nodes")
 
+    def solve_ida(self):
+        """Solves the puzzle with Iterative Deepening A*. Each iteration is a depth-first search that cuts off any node whose cost (depth + Manhattan distance) is over the bound. If it doesn't find the solution, the next bound is the smallest cost that got cut off. Since the Manhattan distance never overestimates, the first solution found is the shortest one."""
+        bound = self.puzzle.total_manhattan_distance()
+        path = [] # Moves made to get to the current position. This is the only thing that grows with the search.
+        while not(self.found_solution):
+            self.iteration_counts.append(0)
+            bound = self.ida_search(0,bound,-1,path)
+        self.solution = "".join([Puzzle.DIGITS[move] for move in path])
+
+    def ida_search(self,depth,bound,prev_pos,path) -> int:
+        """Depth-first search used by each iteration of IDA. The puzzle gets moved forward before searching deeper and moved back afterwards, so when this returns without a solution the puzzle is back where it started.
+
+        Args:
+            depth (int): Depth of the current position in the search tree
+            bound (int): Highest cost allowed in this iteration
+            prev_pos (int): Position the empty space was in before the last move, so we don't undo it. -1 means no moves were made yet
+            path (list[int]): Moves made to get to the current position. When the solution is found, this holds the solution.
+
+        Returns:
+            int: The smallest cost that went over the bound, which becomes the next bound. If the solution was found, this is just its cost.
+        """
+        cost = depth + self.puzzle.total_manhattan_distance()
+        if cost > bound:
+            return cost
+        self.nodes_expanded += 1
+        self.iteration_counts[-1] += 1
+        stats = self.stats
+        if stats is not None:
+            stats.expanded(len(path)) # The path is all IDA keeps instead of a queue
+        if self.puzzle.is_solved():
+            self.found_solution = True
+            return cost
+
+        empty = self.puzzle.get_empty_position()
+        next_bound = float("inf")
+        for move in self.puzzle.list_valid_moves():
+            if move == prev_pos: # Don't undo the last move
+                continue
+            self.puzzle.slide(move)
+            path.append(move)
+            if stats is not None:
+                stats.generated()
+            next_bound = min(next_bound,self.ida_search(depth+1,bound,empty,path))
+            if self.found_solution:
+                return next_bound
+            path.pop()
+            self.puzzle.slide(empty) # Move the puzzle back to try the next move
+        return next_bound
+
+    def solve_bidirectional(self):
+        """Solves the puzzle with Bidirectional Uniform Cost Search. Every move costs the same, so the searches just go one layer at a time, always growing whichever side has the smaller frontier. Once a layer reaches a position the other side has already seen, we finish that layer and use the meeting point with the shortest total path."""
+        board = self.puzzle.board
+        forward_nodes = self.nodes
+        backward_nodes = NodeArena(board)
+        start = forward_nodes.add(self.puzzle.get_state_int(),0,-1,self.puzzle.get_empty_position())
+        goal = backward_nodes.add(board.solved_int,0,-1,0)
+        # Positions seen by each side (as packed integers), pointing to the index of the node that reached them
+        forward = {forward_nodes.states[start] : start}
+        backward = {backward_nodes.states[goal] : goal}
+        forward_layer = [start]
+        backward_layer = [goal]
+        meeting = None
+        while meeting is None and forward_layer and backward_layer:
+            if len(forward_layer) <= len(backward_layer):
+                forward_layer,meeting = self.expand_layer(forward_layer,forward_nodes,forward,backward_nodes,backward)
+            else:
+                backward_layer,meeting = self.expand_layer(backward_layer,backward_nodes,backward,forward_nodes,forward)
+                if meeting is not None:
+                    meeting = (meeting[1],meeting[0]) # Always keep the forward node first
+        self.found_solution = True
+        forward_node,backward_node = meeting
+
+        # The forward half is just the moves from the scramble to the meeting point. The backward half was found going from the solved state to the meeting point, so it has to be flipped around: from each node we move back to its parent, which puts the empty space where the parent had it.
+        moves = [forward_nodes.move_sequence(forward_node)]
+        node = backward_node
+        while backward_nodes.parents[node] != -1:
+            node = backward_nodes.parents[node]
+            moves.append(Puzzle.DIGITS[backward_nodes.moves[node]])
+        self.solution = "".join(moves)
+
+    def expand_layer(self,layer,nodes,seen,other_nodes,other):
+        """Expands every node in one layer of one side of the bidirectional search
+
+        Args:
+            layer (list[int]): Indices of the nodes to expand
+            nodes (NodeArena): Nodes of this side of the search. New nodes get added to it.
+            seen (dict): Positions seen by this side of the search. New nodes get added to it.
+            other_nodes (NodeArena): Nodes of the other side of the search
+            other (dict): Positions seen by the other side of the search
+
+        Returns:
+            tuple: (next_layer, meeting) where next_layer is the list of new node indices and meeting is a (node from this side, node from the other side) pair at the same position with the shortest total depth, or None if the sides haven't met
+        """
+        next_layer = []
+        meeting = None
+        best_depth = 0
+        stats = self.stats
+        for node in layer:
+            self.visited.append(node)
+            self.nodes_expanded += 1
+            if stats is not None:
+                stats.expanded(len(layer)+len(next_layer)) # The frontier is whatever's left of this layer plus the next one, so this is a little high, but never by more than one layer
+            self.puzzle.set_state_int(nodes.states[node])
+            prev_pos = nodes.prev_pos(node)
+            depth = nodes.depths[node] + 1
+            for move in self.puzzle.list_valid_moves():
+                if move == prev_pos: # Don't go back to the previous position
+                    continue
+                state_int = self.puzzle.peek(move)[0]
+                if state_int in seen:
+                    if stats is not None:
+                        stats.pruned()
+                    continue
+                child = nodes.add(state_int,depth,node,move)
+                if stats is not None:
+                    stats.generated()
+                seen[state_int] = child
+                next_layer.append(child)
+                match = other.get(state_int)
+                if match is not None and (meeting is None or depth + other_nodes.depths[match] < best_depth):
+                    meeting = (child,match)
+                    best_depth = depth + other_nodes.depths[match]
+        return next_layer,meeting
+
+    def solve_anytime(self):
+        """Solves the puzzle with Anytime Repairing A*. Each round is a Weighted A* search with a lower weight than the last one, which stops as soon as no position in the queue could lead to a shorter solution than the one we have (with the current weight). Instead of starting over, the next round keeps everything from the last one: the queue just gets re-sorted for the new weight, and positions that got a shorter path after they were already expanded this round go back into it, since those are the only ones whose children could have changed.
+        At any point, the shortest any solution could be is the lowest depth + Manhattan distance waiting to be expanded, so dividing the solution length by that gives the bound. It also can't be worse than the weight of the last round that got to finish. Once the bound gets to 1 the solution is the shortest one."""
+        nodes = self.nodes
+        frontier = self.open
+        started = perf_counter()
+        self.deadline = None if self.time_limit is None else started + self.time_limit
+        estimates = array("H") # Manhattan distance of each node, so the queue can be re-sorted when the weight changes
+        weight = self.weight
+        start = nodes.add(self.puzzle.get_state_int(),0,-1,self.puzzle.get_empty_position())
+        estimates.append(self.puzzle.total_manhattan_distance())
+        self.past_positions[nodes.states[start]] = 0
+        frontier.put(nodes.states[start],weight*estimates[start],start)
+        expanded = set() # Positions expanded this round
+        inconsistent = {} # Positions that got a shorter path after they were already expanded this round, pointing to their newest node
+        goal = None
+        finished_weight = float("inf") # Weight of the last round that wasn't cut short
+        while True:
+            goal,out_of_budget = self.improve_path(weight,expanded,inconsistent,estimates,goal)
+            if not(out_of_budget):
+                finished_weight = weight
+            waiting = [entry[-1] for entry in frontier.entries.values()] + list(inconsistent.values())
+            lowest = min((nodes.depths[node] + estimates[node] for node in waiting),default=None)
+            self.bound = 1.0 if lowest is None else max(1.0,min(finished_weight,nodes.depths[goal]/lowest))
+            self.improvements.append((perf_counter()-started,nodes.depths[goal],self.bound))
+            if self.bound == 1 or out_of_budget:
+                break
+            weight = max(1.0,weight-self.weight_step)
+            # Start the next round: everything waiting gets queued again with its cost for the new weight (in the order it was first queued so ties still come out the same way)
+            entries = sorted(frontier.entries.values(),key=lambda entry: entry[1])
+            frontier = self.open = OpenList()
+            for _,_,state_int,node in entries:
+                frontier.put(state_int,nodes.depths[node] + weight*estimates[node],node)
+            for state_int,node in inconsistent.items():
+                frontier.put(state_int,nodes.depths[node] + weight*estimates[node],node)
+            inconsistent.clear()
+            expanded.clear()
+        self.found_solution = True
+        self.solution = nodes.move_sequence(goal)
+
+    def improve_path(self,weight,expanded,inconsistent,estimates,goal) -> tuple:
+        """Runs one round of Anytime Repairing A* (see solve_anytime())
+
+        Args:
+            weight (float): Weight on the Manhattan distance this round
+            expanded (set): Positions expanded this round. New ones get added to it.
+            inconsistent (dict): Positions that got a shorter path after they were expanded this round. New ones get added to it.
+            estimates (array): Manhattan distance of each node. New nodes get theirs added to it.
+            goal (int): Index of the node with the best solution so far, or None if there isn't one yet
+
+        Returns:
+            tuple: (goal, out_of_budget) where goal is the index of the node with the best solution now and out_of_budget is whether it stopped early because the time or node limit ran out
+        """
+        nodes = self.nodes
+        frontier = self.open
+        puzzle = self.puzzle
+        past_positions = self.past_positions
+        solved_int = puzzle.board.solved_int
+        stats = self.stats
+        goal_depth = float("inf") if goal is None else nodes.depths[goal]
+        while not(frontier.empty()) and frontier.peek()[0] < goal_depth: # The solved state has no Manhattan distance, so its cost is just its depth
+            if goal is not None and self.out_of_budget():
+                return goal,True
+            _,node = frontier.get()
+            state_int = nodes.states[node]
+            expanded.add(state_int)
+            self.visited.append(node)
+            self.nodes_expanded += 1
+            if stats is not None:
+                stats.expanded(frontier.qsize())
+            depth = nodes.depths[node] + 1
+            puzzle.set_state_int(state_int)
+            prev_pos = nodes.prev_pos(node)
+            for move in puzzle.list_valid_moves():
+                if move == prev_pos: # Don't go back to the previous position
+                    continue
+                child_int,_,manhattan,_ = puzzle.peek(move)
+                best_depth = past_positions.get(child_int)
+                if best_depth is not None and best_depth <= depth:
+                    if stats is not None:
+                        stats.pruned()
+                    continue
+                past_positions[child_int] = depth
+                child = nodes.add(child_int,depth,node,move)
+                estimates.append(manhattan)
+                if stats is not None:
+                    stats.generated()
+                if child_int == solved_int:
+                    goal = child
+                    goal_depth = depth
+                if child_int in expanded:
+                    inconsistent[child_int] = child
+                else:
+                    frontier.put(child_int,depth + weight*manhattan,child)
+        return goal,False
+
+    def out_of_budget(self) -> bool:
+        """Returns true if "ARA" has used up its time or node limit"""
+        if self.node_limit is not None and self.nodes_expanded >= self.node_limit:
+            return True
+        return self.deadline is not None and perf_counter() >= self.deadline
+
     def reset(self):
         """Resets the solver to prepare for another puzzle"""
-        self.puzzle.set_state("012345678")
-        self.visited = []
-        self.open = PriorityQueue()
-        self.past_positions = set()
+        self.puzzle.track_heuristics = self.alg not in ["UCS","BIDI","PDB","TABLE"] # UCS and BIDI only use the depth, and PDB and TABLE have their own way of knowing how far away the solution is, so there's no point updating the heuristics on every move
+        self.puzzle.set_state_int(self.puzzle.board.solved_int)
+        self.nodes = NodeArena(self.puzzle.board)
+        self.visited = array("I")
+        self.open = OpenList()
+        self.past_positions = self.new_closed_set()
         self.found_solution = False
+        self.solution = ""
+        self.nodes_expanded = 0
+        self.iteration_counts = []
+        self.bound = None
+        self.improvements = []
+        if self.stats is not None:
+            self.stats.reset()
+
+    def new_closed_set(self):
+        """Returns an empty ClosedSet to keep track of past positions if the board is small enough for one (and compact_closed is on), otherwise an empty dictionary"""
+        if self.compact_closed and self.puzzle.board.size <= ClosedSet.MAX_SIZE:
+            return ClosedSet(self.puzzle.board,track_depth=self.alg != "BFS") # Best-first Search never re-queues a position, so it only needs to know if it's been seen
+        return {}
 
     def expand(self):
         """Visits a given node by finding the next valid states of the puzzle"""
-        _,node = self.open.get() # Pull the next node from the priority queue
+        _,node = self.open.get() # Pull the index of the next node from the priority queue (it never returns an outdated node for a position that was re-queued with a better cost)
         self.visited.append(node)
-        next_depth = node.depth + 1 # Next nodes will have more depth
-        self.puzzle.set_state(node.puzzle_state)
-        # logging.info(f"<{'='*30}>\nNode at depth {node.depth}:\n{self.puzzle}\n{'='*30}")
+        self.nodes_expanded += 1
+        if self.stats is not None:
+            self.stats.expanded(self.open.qsize())
+        nodes = self.nodes
+        next_depth = nodes.depths[node] + 1 # Next nodes will have more depth
+        self.puzzle.set_state_int(nodes.states[node]) # No need to validate since the state came from the solver itself
+        # logging.info(f"<{'='*30}>\nNode at depth {nodes.depths[node]}:\n{self.puzzle}\n{'='*30}")
         # logging.info(f"Hamming Distance: {self.puzzle.get_unsolved_pieces()}")
         # logging.info(f"Manhattan Distance: {self.puzzle.total_manhattan_distance()}")
         # logging.info(f"Nilsson Score: {self.puzzle.nilsson_score()}")
         # logging.info(f"Inversions: {self.puzzle.count_inversions()}")
-        # logging.info(f"Moves:{node.move_sequence()}")
+        # logging.info(f"Moves:{nodes.move_sequence(node)}")
         if self.puzzle.is_solved():
             self.found_solution = True
-            logging.info(f"Solution: {node.move_sequence()}")
+            self.solution = nodes.move_sequence(node)
             return
-        prev_pos = self.puzzle.get_empty_position() # prev_pos of the next nodes will be the current position. This will make sure that if/when we expand those nodes, they never make a move back to the previous position.
+        prev_pos = nodes.prev_pos(node) # Where the empty space was before the last move
         next_moves = self.puzzle.list_valid_moves()
-        if node.prev_pos in next_moves: # Remove the previous position from the list so we don't go back to it
-            next_moves.remove(node.prev_pos)
+        if prev_pos in next_moves: # Remove the previous position from the list so we don't go back to it
+            next_moves.remove(prev_pos)
         
         # logging.info(f"{len(next_moves)} available moves:")
 
         for move in next_moves: # Now we go through the next valid moves and create new states
             # logging.info(f"\nPuzzle after moving {self.puzzle.state[move]} to the empty square:")
-            self.puzzle.move(move)
-            self.create_node(next_depth,prev_pos,parent=node)
-            self.puzzle.move(prev_pos) # Return the puzzle to the previous position to add the next move
+            self.create_node(self.puzzle.peek(move),next_depth,move,parent=node) # peek() gives us the next state and its heuristics without having to move the puzzle and move it back
 
-    def create_node(self,depth,prev_pos=-1,parent=None):
-        """Calculates the total cost of the current puzzle state and creates and queues a new node with the given depth
+    def create_node(self,child,depth,move,parent=-1):
+        """Calculates the total cost of a puzzle state and creates and queues a new node with the given depth
 
         Args:
+            child (tuple): The (state_int, hamming, manhattan, sequence) of the new node, as given by Puzzle.peek() or Puzzle.snapshot()
             depth (int): Depth of the node in the search tree
-            prev_pos (int): Used to avoid repeating a previous position. -1 just means this is the starting position so there were no previous moves made before
+            move (int): Position the empty space is in for the new node (the square the piece moved out of)
+            parent (int): Index of the parent node. -1 just means this is the starting position so there were no previous moves made before
         """
-        if self.puzzle.get_state_str() in self.past_positions: # If the puzzle has been in that position before, don't bother adding a node, otherwise we end up with looping
+        state_int,_,manhattan,sequence = child
+        best_depth = self.past_positions.get(state_int)
+        # If the puzzle has been in that position before, don't bother adding a node, otherwise we end up with looping. The exception is when we found a shorter path to it, since UCS and A* use the depth in the cost, so the node deserves a better spot in the queue.
+        if best_depth is not None and (self.alg == "BFS" or best_depth <= depth):
+            if self.stats is not None:
+                self.stats.pruned()
             return
+        stats = self.stats
+        if stats is not None:
+            heuristic_start = perf_counter_ns()
         cost = 0
         if self.alg == "UCS": # Uniform Cost Search just uses the node's depth as the cost
             cost = depth
         elif self.alg == "BFS": # Best-first Search uses the Manhattan distance of the current puzzle state
-            cost = self.puzzle.total_manhattan_distance()
+            cost = manhattan
         elif self.alg == "A": # A* Search uses both the depth and the Nilsson's sequence to calculate the cost
-            cost = depth + self.puzzle.nilsson_score()
+            cost = depth + 3*sequence + manhattan # Same as Puzzle.nilsson_score(), but for the child state
+        elif self.alg == "WA": # Weighted A* trusts the Manhattan distance more than the depth
+            cost = depth + self.weight*manhattan
+        elif self.alg == "PDB": # Pattern database A* uses the depth and the pattern database estimate
+            cost = depth + self.pdb.heuristic(self.puzzle.board.decode(state_int))
         else: # If the Solver object does not have a specified algorithm or was initialized with an invalid algorithm, something went really wrong
             raise Exception("Something went wrong. No valid algorithm was specified.")
-        
-        self.past_positions.add(self.puzzle.get_state_str())
-        node = Node(self.puzzle.get_state_str(),depth,prev_pos,parent)
+        if stats is not None:
+            stats.heuristic_ns += perf_counter_ns() - heuristic_start
+            stats.generated()
+
+        self.past_positions[state_int] = depth
+        node = self.nodes.add(state_int,depth,parent,move)
         # logging.info(f"{self.puzzle}\nCost: {cost}\nDepth: {depth}")
-        self.open.put((cost,node)) # Place the node into the priority queue
+        self.open.put(state_int,cost,node) # Place the node into the priority queue, replacing the old node for this position if there was one
 
-class Node:
+class NodeArena:
     """
-    A class to implement the nodes for the search algorithms to traverse
+    A class to store the nodes for the search algorithms to traverse. Instead of making an object for every node, each node is just an index into a few typed arrays, one for each thing we need to know about it. A node object has a whole dictionary attached to it, so this takes a fraction of the memory and gives the garbage collector way less to keep track of during big searches.
 
     Attributes:
-        puzzle_state (str): String representing the state of the puzzle
-        depth (int): Depth of the node in the search tree
-        prev_pos (int): Used by the search algorithm to avoid a previous position
+        states (array or list): Packed integer representing the state of the puzzle at each node (see Board.encode()). It's a list when the packed states are too big to fit in 64 bits.
+        depths (array): Depth of each node in the search tree
+        parents (array): Index of each node's parent, or -1 for the starting node
+        moves (array): Position of the empty space at each node. For every node except the starting one, that's the move that got us there, since the piece moved out of that square.
     """
 
-    def __init__(self,puzzle_state,depth,prev_pos=-1,parent=None):
-        self.puzzle_state = puzzle_state
-        self.depth = depth
-        self.prev_pos = prev_pos
-        self.parent = parent
-
-    def move_sequence(self):
-        """Traces the move sequence"""
-        if self.prev_pos == -1 or self.parent.prev_pos == -1: return ''
-        return self.parent.move_sequence() + str(self.prev_pos)
-
-    def __repr__(self):
-        return f"{self.puzzle_state}"
-    
-    def __lt__(self,other):
-        return str(self) < other
-    
-    def __gt__(self,other):
-        return str(self) > other
-    
-    def __eq__(self, other):
-        return str(self) == other
+    def __init__(self,board):
+        self.states = array("Q") if board.bits*board.size <= 64 else []
+        self.depths = array("H")
+        self.parents = array("i")
+        self.moves = array("b")
+
+    def add(self,state_int,depth,parent,move) -> int:
+        """Adds a node and returns its index
+
+        Args:
+            state_int (int): Packed state of the puzzle at the node
+            depth (int): Depth of the node in the search tree
+            parent (int): Index of the parent node, or -1 for the starting node
+            move (int): Position of the empty space at the node
+        """
+        self.states.append(state_int)
+        self.depths.append(depth)
+        self.parents.append(parent)
+        self.moves.append(move)
+        return len(self.depths) - 1
+
+    def prev_pos(self,node) -> int:
+        """Returns where the empty space was before the move that got to the node (the parent's empty space), so the search can avoid moving straight back. Returns -1 for the starting node."""
+        parent = self.parents[node]
+        return self.moves[parent] if parent != -1 else -1
+
+    def move_sequence(self,node) -> str:
+        """Traces the move sequence from the starting node to the given node. It follows the parents back to the start and then flips the moves around, so it doesn't matter how deep the node is."""
+        moves = []
+        while self.parents[node] != -1:
+            moves.append(Puzzle.DIGITS[self.moves[node]])
+            node = self.parents[node]
+        moves.reverse()
+        return "".join(moves)
+
+    def __len__(self):
+        return len(self.depths)
+
+class ClosedSet:
+    """
+    A class to keep track of the positions the search has already seen, without a set or dictionary. Every solvable position of the board gets ranked to an index (see Board.rank()) into an array that's allocated up front, so checking a position is just an array lookup, and the memory it uses never grows no matter how far the search goes. It's about 350KB for the 8-puzzle (or 23KB without depths), compared to the ~100 bytes per position a set of them takes. The number of positions grows too fast for this to work past 10 squares though.
+    It can be used just like the past_positions dictionary: get() returns the lowest depth a position was reached at (or None if it hasn't been), and setting it records a new depth.
+
+    Attributes:
+        board (Board): Board the positions are on
+        track_depth (bool): Whether to store the lowest depth of each position. If not, only one bit per position is used and get() returns 0 for every position that was seen.
+        depths (array): Lowest depth each position has been reached at (NOT_SEEN if it hasn't been). Only used if track_depth is on.
+        bits (bytearray): One bit per position saying whether it's been seen. Only used if track_depth is off.
+    """
+
+    MAX_SIZE = 10 # Biggest board (in squares) that gets a ClosedSet (10!/2 positions is already 3.6MB with depths)
+    NOT_SEEN = 0xFFFF
+
+    def __init__(self,board,track_depth=True):
+        if board.size > ClosedSet.MAX_SIZE:
+            raise Exception(f"A {board.rows}x{board.cols} board has too many positions for a ClosedSet")
+        self.board = board
+        self.track_depth = track_depth
+        count = placement_count(board.size,board.size-2)
+        if track_depth:
+            self.depths = array("H",[ClosedSet.NOT_SEEN])*count
+        else:
+            self.bits = bytearray(count//8 + 1)
+
+    def get(self,state_int,default=None):
+        """Returns the lowest depth the position was reached at, or default if it hasn't been seen"""
+        rank = self.board.rank(state_int)
+        if self.track_depth:
+            depth = self.depths[rank]
+            return default if depth == ClosedSet.NOT_SEEN else depth
+        return 0 if self.bits[rank >> 3] & (1 << (rank & 7)) else default
+
+    def __setitem__(self,state_int,depth):
+        rank = self.board.rank(state_int)
+        if self.track_depth:
+            self.depths[rank] = depth
+        else:
+            self.bits[rank >> 3] |= 1 << (rank & 7)
+
+    def __contains__(self,state_int):
+        return self.get(state_int) is not None
+
+class OpenList:
+    """
+    A priority queue for the search algorithms built on heapq. queue.PriorityQueue locks on every put and get since it's meant for threads, which we don't need. Ties are broken by insertion order (first in, first out), so the results are the same every run. Each entry is keyed by the puzzle position, and putting a position that's already in the queue replaces the old entry (decrease-key). The old entry is just marked as removed and gets skipped when it reaches the top of the heap, since heapq can't remove things from the middle.
+
+    Attributes:
+        heap (list): Heap of [cost, insertion count, key, item] entries
+        entries (dict): Maps each key to its live entry in the heap
+        counter (int): Number of entries put so far, used to break ties
+    """
+
+    REMOVED = object() # Placeholder for the item of an entry that was replaced
+
+    def __init__(self):
+        self.heap = []
+        self.entries = {}
+        self.counter = 0
+
+    def put(self,key,cost,item):
+        """Adds an item to the queue, replacing the item that was queued under the same key if there is one
+
+        Args:
+            key (int): Key identifying the item (the packed puzzle state)
+            cost (int): Priority of the item. Lower costs come out first
+            item (int): The item to queue (the index of a node)
+        """
+        old_entry = self.entries.get(key)
+        if old_entry is not None:
+            old_entry[-1] = OpenList.REMOVED
+        entry = [cost,self.counter,key,item]
+        self.counter += 1
+        self.entries[key] = entry
+        heapq.heappush(self.heap,entry)
+
+    def get(self):
+        """Removes and returns the (cost, item) pair with the lowest cost. Raises an error if the queue is empty."""
+        while self.heap:
+            cost,_,key,item = heapq.heappop(self.heap)
+            if item is not OpenList.REMOVED:
+                del self.entries[key]
+                return cost,item
+        raise Exception("Cannot get from an empty OpenList")
+
+    def peek(self):
+        """Returns the (cost, item) pair with the lowest cost without removing it. Raises an error if the queue is empty."""
+        heap = self.heap
+        while heap and heap[0][-1] is OpenList.REMOVED: # Throw away replaced entries until a live one is on top
+            heapq.heappop(heap)
+        if not heap:
+            raise Exception("Cannot peek at an empty OpenList")
+        return heap[0][0],heap[0][-1]
+
+    def empty(self) -> bool:
+        """Returns true if there are no items left in the queue"""
+        return not self.entries
+
+    def qsize(self) -> int:
+        """Returns the number of items in the queue"""
+        return len(self.entries)
 
 if __name__=="__main__":
+    start_trace_log()
     puzz = "412367580"
 
     UCS = Solver()
     UCS.solve(puzz)
-    logging.info(f"Visited {len(UCS.visited)} nodes")
+    TRACE.info(f"Visited {len(UCS.visited)} nodes")
 
-    logging.info(f"{'='*50}\nBest-first Search\n{'='*100}")
+    TRACE.info(f"{'='*50}\nBest-first Search\n{'='*100}")
     BFS = Solver("BFS")
     BFS.solve(puzz)
 
-    logging.info(f"{'='*50}\nA* Search\n{'='*100}")
+    TRACE.info(f"{'='*50}\nA* Search\n{'='*100}")
     A_star = Solver("A")
-    A_star.solve(puzz)
\ No newline at end of file
+    A_star.solve(puzz)
+
+    TRACE.info(f"{'='*50}\nBidirectional Search\n{'='*100}")
+    BIDI = Solver("BIDI")
+    BIDI.solve(puzz)
+    TRACE.info(f"Visited {BIDI.nodes_expanded} nodes")
+
+    TRACE.info(f"{'='*50}\nPattern Database A* Search\n{'='*100}")
+    PDB = Solver("PDB")
+    PDB.solve(puzz)
+    TRACE.info(f"Visited {PDB.nodes_expanded} nodes")
+
+    TRACE.info(f"{'='*50}\nIDA* Search\n{'='*100}")
+    IDA_star = Solver("IDA")
+    IDA_star.solve(puzz)
+    TRACE.info(f"Visited {IDA_star.nodes_expanded} nodes over {len(IDA_star.iteration_counts)} iterations: {IDA_star.iteration_counts}")
+
+    TRACE.info(f"{'='*50}\nWeighted A* Search\n{'='*100}")
+    WA_star = Solver("WA",weight=2.0)
+    WA_star.solve(puzz)
+    TRACE.info(f"Visited {WA_star.nodes_expanded} nodes, solution is at most {WA_star.bound}x the shortest")
+
+    TRACE.info(f"{'='*50}\nARA* Search\n{'='*100}")
+    ARA_star = Solver("ARA",weight=3.0)
+    ARA_star.solve(puzz)
+    TRACE.info(f"Visited {ARA_star.nodes_expanded} nodes. Solutions found (seconds, length, bound): {ARA_star.improvements}")
\ No newline at end of file
@@ -0,0 +1,138 @@
+import numpy as np
+from puzzle import *
+
+# The functions in puzzle.py work on one state list at a time, which is fine for the solver but way too slow for looking at millions of scrambles at once. These do the same thing for a whole (N, size) uint8 array of states in one go, using the board's lookup tables as numpy arrays. Everything gets gathered/broadcast over the whole array instead of looping in Python.
+
+BATCH_TABLES = {} # Numpy versions of each board's lookup tables, keyed the same way as BOARDS
+
+class BatchTables:
+    """
+    A class holding the lookup tables of a Board as numpy arrays so they can be indexed with whole arrays of states. Use get_batch_tables() instead of making these directly so each board only gets converted once.
+
+    Attributes:
+        board (Board): Board the tables are for
+        manhattan (ndarray): manhattan[piece, position] is the Manhattan distance of the piece at that position (see Board.manhattan)
+        nilsson_pair (ndarray): nilsson_pair[piece, next_piece] is what the pair adds to the Nilsson sequence (see Board.nilsson_pair)
+        pair_first (ndarray): First position of each pair in Board.pairs
+        pair_second (ndarray): Second position of each pair in Board.pairs
+        row_major_order (ndarray): Positions in row-major order (see Board.row_major_order)
+        empty_row (ndarray): empty_row[position] is the row of that position, used for the solvability check on even widths
+        shifts (ndarray): Bit shift of each position in a packed state
+        digit_values (ndarray): digit_values[ord(character)] is the value of a character from Puzzle.DIGITS
+        upper (ndarray): (size, size) mask of the pairs i < j, used to count inversions
+    """
+
+    def __init__(self,board):
+        self.board = board
+        self.manhattan = np.array(board.manhattan,dtype=np.uint8)
+        self.nilsson_pair = np.array(board.nilsson_pair,dtype=np.uint8)
+        self.pair_first = np.array([i for i,j in board.pairs],dtype=np.intp)
+        self.pair_second = np.array([j for i,j in board.pairs],dtype=np.intp)
+        self.row_major_order = np.array(board.row_major_order,dtype=np.intp)
+        self.empty_row = np.array([row for row,col in board.coords],dtype=np.int64)
+        self.shifts = np.arange(board.size,dtype=np.uint64)*np.uint64(board.bits)
+        self.digit_values = np.zeros(128,dtype=np.uint8)
+        for value,character in enumerate(Puzzle.DIGITS):
+            self.digit_values[ord(character)] = value
+            self.digit_values[ord(character.lower())] = value
+        self.upper = np.triu(np.ones((board.size,board.size),dtype=bool),k=1)
+
+def get_batch_tables(board=DEFAULT_BOARD) -> BatchTables:
+    """Returns the BatchTables for a board, only building them the first time they're asked for"""
+    key = (board.rows,board.cols,board.layout)
+    if key not in BATCH_TABLES:
+        BATCH_TABLES[key] = BatchTables(board)
+    return BATCH_TABLES[key]
+
+def states_from_strings(strings,board=DEFAULT_BOARD) -> np.ndarray:
+    """Turns a list of state strings (like Puzzle.get_state_str()) into an (N, size) uint8 array. The strings aren't validated, so they need to be proper states of the board."""
+    tables = get_batch_tables(board)
+    characters = np.frombuffer("".join(strings).encode("ascii"),dtype=np.uint8)
+    return tables.digit_values[characters].reshape(-1,board.size)
+
+def states_from_ints(state_ints,board=DEFAULT_BOARD) -> np.ndarray:
+    """Unpacks a list or array of packed states (like Puzzle.get_state_int()) into an (N, size) uint8 array. Only works for boards whose packed states fit in 64 bits (up to 4x4)."""
+    if board.size*board.bits > 64:
+        raise Exception(f"Packed states of a {board.rows}x{board.cols} board don't fit in 64 bits")
+    tables = get_batch_tables(board)
+    state_ints = np.asarray(state_ints,dtype=np.uint64).reshape(-1,1)
+    return ((state_ints >> tables.shifts) & np.uint64(board.mask)).astype(np.uint8)
+
+def batch_hamming_distance(states,board=DEFAULT_BOARD) -> np.ndarray:
+    """Returns the Hamming distance of every state in an (N, size) array (see hamming_distance())"""
+    states = np.asarray(states)
+    return ((states != np.arange(board.size)) & (states != 0)).sum(axis=1)
+
+def batch_manhattan_distance(states,board=DEFAULT_BOARD) -> np.ndarray:
+    """Returns the total Manhattan distance of every state in an (N, size) array (see manhattan_distance())"""
+    tables = get_batch_tables(board)
+    states = np.asarray(states)
+    return tables.manhattan[states,np.arange(board.size)].sum(axis=1,dtype=np.int64)
+
+def batch_nilsson_sequence(states,board=DEFAULT_BOARD) -> np.ndarray:
+    """Returns the sequence part of the Nilsson's sequence score of every state in an (N, size) array (see nilsson_sequence())"""
+    tables = get_batch_tables(board)
+    states = np.asarray(states)
+    pair_scores = tables.nilsson_pair[states[:,tables.pair_first],states[:,tables.pair_second]]
+    return pair_scores.sum(axis=1,dtype=np.int64) + (states[:,0] != 0)
+
+def batch_nilsson_sequence_score(states,board=DEFAULT_BOARD) -> np.ndarray:
+    """Returns the Nilsson's sequence score of every state in an (N, size) array (see Puzzle.nilsson_score())"""
+    return 3*batch_nilsson_sequence(states,board) + batch_manhattan_distance(states,board)
+
+def batch_count_inversions(states,board=DEFAULT_BOARD) -> np.ndarray:
+    """Counts the inversions of every state in an (N, size) array (see count_inversions()). Every pair of positions gets compared at once, which is size*size comparisons per state, but that's nothing for the board sizes we can actually solve."""
+    tables = get_batch_tables(board)
+    ordered = np.asarray(states)[:,tables.row_major_order]
+    # The empty space isn't counted, and since it's the smallest piece it can only ever be on the right side of an inversion
+    inverted = (ordered[:,:,None] > ordered[:,None,:]) & (ordered[:,None,:] != 0) & tables.upper
+    return inverted.sum(axis=(1,2))
+
+def batch_is_solvable(states,board=DEFAULT_BOARD) -> np.ndarray:
+    """Returns a boolean mask of which states in an (N, size) array are solvable (see Puzzle.is_solvable())"""
+    states = np.asarray(states)
+    return _solvable_mask(states,batch_count_inversions(states,board),board)
+
+def _solvable_mask(states,inversions,board) -> np.ndarray:
+    """Turns the inversion counts of some states into the solvable mask, so batch_features() doesn't have to count them twice"""
+    parity = inversions
+    if board.cols%2 == 0:
+        parity = parity + get_batch_tables(board).empty_row[np.argmin(states,axis=1)] # The empty space is the only 0, so argmin finds it
+    return parity%2 == board.solved_parity
+
+def batch_features(states,board=DEFAULT_BOARD) -> dict:
+    """Works out every heuristic for an (N, size) array of states at once, which is handy for looking at how hard a bunch of scrambles are
+
+    Args:
+        states (ndarray): (N, size) array of states
+        board (Board): Board the states are on
+
+    Returns:
+        dict: Arrays with one value per state for "Hamming", "Manhattan", "Nilsson", "Inversions" and "Solvable"
+    """
+    states = np.asarray(states)
+    manhattan = batch_manhattan_distance(states,board)
+    inversions = batch_count_inversions(states,board)
+    return {
+        "Hamming" : batch_hamming_distance(states,board),
+        "Manhattan" : manhattan,
+        "Nilsson" : 3*batch_nilsson_sequence(states,board) + manhattan,
+        "Inversions" : inversions,
+        "Solvable" : _solvable_mask(states,inversions,board)
+    }
+
+if __name__=="__main__":
+    # Rough speed comparison on the 8-puzzle (test_batch_heuristics.py checks that the batch versions match the normal ones)
+    from time import time_ns
+    rng = random.Random(5)
+    state_lists = [rng.sample(range(9),9) for i in range(200000)]
+    states = np.array(state_lists,dtype=np.uint8)
+    start = time_ns()
+    batch_features(states)
+    batch_time = (time_ns()-start)/1000000
+    start = time_ns()
+    for state in state_lists:
+        manhattan_distance(state)
+        count_inversions(state,DEFAULT_BOARD)
+    loop_time = (time_ns()-start)/1000000
+    print(f"{len(state_lists)} states: {batch_time:.1f}ms for every batch feature, {loop_time:.1f}ms for just Manhattan and inversions one at a time")
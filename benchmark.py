@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import timeit
+import argparse
+import platform
+import subprocess
+from time import perf_counter
+from datetime import datetime, timezone
+from puzzle import *
+from Solver import Solver
+from state_table import StateTable
+from pipeline import depth_scrambles
+
+# main.py is good for looking at how the algorithms compare, but its scrambles change whenever Puzzle.shuffle() does and it doesn't save anything about the machine it ran on, so its numbers can't really be compared between runs. This runs the same fixed scrambles every time and saves the results as JSON, so they can be compared against an older run to catch anything that got slower.
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),"corpus.json") # Fixed scrambles, grouped by the length of their shortest solution
+CORPUS_DEPTHS = [8,12,16,20,24,28] # Shortest solution lengths in the corpus. The 8-puzzle never needs more than 31 moves.
+MACRO_ALGS = ["UCS","BFS","A","PDB","IDA","BIDI","WA","ARA"] # Algorithms the macro benchmarks run by default
+MAX_DEPTHS = {"UCS" : 20} # UCS takes seconds per scramble past this, which makes the whole suite drag
+
+def make_corpus(per_depth=10,seed=2024,depths=CORPUS_DEPTHS) -> dict:
+    """Builds a corpus of scrambles with known shortest solutions. The candidates come from depth_scrambles(), so they're random walks from the solved state with their depth looked up in the StateTable.
+
+    Args:
+        per_depth (int): Number of scrambles to find for each depth
+        seed (int): Seed for the random walks
+        depths (list[int]): Shortest solution lengths to find scrambles for
+
+    Returns:
+        dict: {"seed": seed, "scrambles": {depth: [scrambles]}} with the depths as strings (since that's what JSON needs)
+    """
+    table = StateTable.load_or_build(DEFAULT_BOARD)
+    counts = table.depth_counts()
+    for depth in depths:
+        if depth < len(counts) and per_depth > counts[depth]:
+            raise Exception(f"There are only {counts[depth]} scrambles that take {depth} moves to solve, so there can't be {per_depth} of them")
+    candidates = depth_scrambles(random.Random(seed),depths,table)
+    groups = {depth : [] for depth in depths}
+    while any(len(group) < per_depth for group in groups.values()):
+        scramble,depth = next(candidates)
+        if len(groups[depth]) < per_depth and scramble not in groups[depth]:
+            groups[depth].append(scramble)
+    return {"seed" : seed, "scrambles" : {str(depth) : group for depth,group in groups.items()}}
+
+def load_corpus(path=CORPUS_FILE) -> dict:
+    """Loads the corpus saved by the corpus command, with the depths turned back into ints"""
+    with open(path) as file:
+        corpus = json.load(file)
+    return {int(depth) : scrambles for depth,scrambles in corpus["scrambles"].items()}
+
+def environment() -> dict:
+    """Returns what the results depend on besides the code: the Python version, the machine and the git commit"""
+    try:
+        commit = subprocess.run(["git","rev-parse","HEAD"],capture_output=True,text=True,cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "python" : platform.python_version(),
+        "implementation" : platform.python_implementation(),
+        "platform" : platform.platform(),
+        "machine" : platform.machine(),
+        "processor" : platform.processor(),
+        "cpu_count" : os.cpu_count(),
+        "commit" : commit,
+        "time" : datetime.now(timezone.utc).isoformat(timespec="seconds")
+    }
+
+def time_per_call(function,repeat=5) -> float:
+    """Returns the time one call of function takes in nanoseconds. timeit works out how many calls take long enough to measure, and the best of the repeats is used since anything slower than that is just other stuff on the machine getting in the way."""
+    timer = timeit.Timer(function)
+    number,_ = timer.autorange()
+    return min(timer.repeat(repeat,number))/number*1e9
+
+def run_micro(repeat=5) -> dict:
+    """Times the Puzzle operations the solver does on every node
+
+    Args:
+        repeat (int): Number of times to repeat each measurement
+
+    Returns:
+        dict: Nanoseconds per call of each operation
+    """
+    puzzle = Puzzle("412367580")
+    state = puzzle.state.copy()
+    state_int = puzzle.get_state_int()
+    board = puzzle.board
+    move = puzzle.list_valid_moves()[0]
+    empty = puzzle.get_empty_position()
+    quiet = Puzzle("412367580",track_heuristics=False)
+
+    def move_and_back(): # Moves always get undone so every call starts from the same position
+        puzzle.move(move)
+        puzzle.move(empty)
+
+    def slide_and_back():
+        puzzle.slide(move)
+        puzzle.slide(empty)
+
+    def slide_and_back_untracked():
+        quiet.slide(move)
+        quiet.slide(empty)
+
+    cases = {
+        "move" : (move_and_back,2),
+        "slide" : (slide_and_back,2),
+        "slide (no heuristics)" : (slide_and_back_untracked,2),
+        "peek" : (lambda: puzzle.peek(move),1),
+        "list_valid_moves" : (puzzle.list_valid_moves,1),
+        "set_state" : (lambda: puzzle.set_state("412367580"),1),
+        "set_state_int" : (lambda: puzzle.set_state_int(state_int),1),
+        "get_state_str" : (puzzle.get_state_str,1),
+        "hamming_distance" : (lambda: hamming_distance(state),1),
+        "manhattan_distance" : (lambda: manhattan_distance(state,board),1),
+        "nilsson_sequence_score" : (lambda: nilsson_sequence_score(state,board),1),
+        "count_inversions" : (lambda: count_inversions(state,board),1),
+        "is_solvable" : (puzzle.is_solvable,1),
+        "board.rank" : (lambda: board.rank(state_int),1)
+    }
+    return {name : time_per_call(function,repeat)/calls for name,(function,calls) in cases.items()}
+
+def run_macro(corpus,algs=MACRO_ALGS,depths=None,repeat=3) -> dict:
+    """Solves every scramble in the corpus with each algorithm
+
+    Args:
+        corpus (dict): Scrambles grouped by depth, from load_corpus()
+        algs (list[str]): Algorithms to run
+        depths (list[int]): Depths to run. Defaults to every depth in the corpus.
+        repeat (int): Number of times to solve each group. Only the fastest time is kept.
+
+    Returns:
+        dict: {"ALG/depth": {"seconds", "nodes", "moves"}} where seconds is the time for the whole group and nodes and moves are added up over it
+    """
+    results = {}
+    for alg in algs:
+        solver = Solver(alg,trace=False)
+        for depth,scrambles in sorted(corpus.items()):
+            if (depths and depth not in depths) or depth > MAX_DEPTHS.get(alg,depth):
+                continue
+            best = float("inf")
+            for i in range(repeat):
+                nodes = 0
+                moves = 0
+                start = perf_counter()
+                for scramble in scrambles:
+                    moves += len(solver.solve(scramble))
+                    nodes += solver.nodes_expanded
+                best = min(best,perf_counter()-start)
+            results[f"{alg}/{depth}"] = {"seconds" : best,"nodes" : nodes,"moves" : moves}
+            print(f"{alg} depth {depth}: {best*1000:.1f}ms, {nodes} nodes, {moves} moves")
+    return results
+
+def compare(results,baseline,threshold=0.2) -> list:
+    """Compares results against a baseline from an earlier run
+
+    Args:
+        results (dict): Results of this run
+        baseline (dict): Results of the earlier run
+        threshold (float): How much slower (as a fraction) something can get before it counts as a regression, since timings always move around a bit. Node counts and solution lengths don't depend on the machine, so any increase in those counts.
+
+    Returns:
+        list[str]: A description of each regression (empty if there weren't any)
+    """
+    regressions = []
+    for name,ns in results.get("micro",{}).items():
+        old = baseline.get("micro",{}).get(name)
+        if old is not None and ns > old*(1+threshold):
+            regressions.append(f"micro {name}: {old:.0f}ns -> {ns:.0f}ns ({ns/old-1:+.0%})")
+    for name,result in results.get("macro",{}).items():
+        old = baseline.get("macro",{}).get(name)
+        if old is None:
+            continue
+        if result["seconds"] > old["seconds"]*(1+threshold):
+            regressions.append(f"macro {name}: {old['seconds']*1000:.1f}ms -> {result['seconds']*1000:.1f}ms ({result['seconds']/old['seconds']-1:+.0%})")
+        for key in ["nodes","moves"]:
+            if result[key] > old[key]:
+                regressions.append(f"macro {name}: {key} went from {old[key]} to {result[key]}")
+    return regressions
+
+def command_corpus(args):
+    corpus = make_corpus(args.per_depth,args.seed)
+    with open(args.path,"w") as file:
+        json.dump(corpus,file,indent=1)
+    print(f"Saved {sum(len(group) for group in corpus['scrambles'].values())} scrambles to {args.path}")
+
+def command_run(args):
+    results = {"environment" : environment()}
+    if not(args.macro_only):
+        results["micro"] = run_micro(args.repeat)
+        for name,ns in results["micro"].items():
+            print(f"{name}: {ns:.0f}ns")
+    if not(args.micro_only):
+        results["macro"] = run_macro(load_corpus(args.corpus),args.algs,args.depths,args.repeat)
+    with open(args.output,"w") as file:
+        json.dump(results,file,indent=1)
+    print(f"Saved the results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results,baseline,args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions against {args.baseline} (made with commit {baseline.get('environment',{}).get('commit')}):")
+            for regression in regressions:
+                print(f"\t{regression}")
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the puzzle and the solvers on a fixed set of scrambles")
+    commands = parser.add_subparsers(dest="command",required=True)
+
+    corpus = commands.add_parser("corpus",help="Build the fixed set of scrambles (only needed if the corpus should change)")
+    corpus.add_argument("--per-depth",type=int,default=10,help="Scrambles for each depth")
+    corpus.add_argument("--seed",type=int,default=2024)
+    corpus.add_argument("--path",default=CORPUS_FILE)
+
+    run = commands.add_parser("run",help="Run the benchmarks and save the results as JSON")
+    run.add_argument("--output",default="benchmark.json",help="Where to save the results")
+    run.add_argument("--baseline",default=None,help="Results of an earlier run to compare against. Exits with 1 if anything regressed.")
+    run.add_argument("--threshold",type=float,default=0.2,help="How much slower something can get before it counts as a regression")
+    run.add_argument("--corpus",default=CORPUS_FILE)
+    run.add_argument("--algs",nargs="+",default=MACRO_ALGS,choices=MACRO_ALGS)
+    run.add_argument("--depths",nargs="+",type=int,default=None,help="Only run these depths from the corpus")
+    run.add_argument("--repeat",type=int,default=3,help="Times to repeat each measurement (the fastest one is kept)")
+    run.add_argument("--micro-only",action="store_true")
+    run.add_argument("--macro-only",action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "corpus":
+        command_corpus(args)
+    else:
+        command_run(args)
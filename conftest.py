@@ -0,0 +1,8 @@
+import pytest
+from puzzle import DEFAULT_BOARD
+from state_table import StateTable
+
+@pytest.fixture(scope="session")
+def table():
+    """State table for the 8-puzzle, used to look up the length of the shortest solution. It's built in memory once for every test, so nothing gets saved in the current directory."""
+    return StateTable.build(DEFAULT_BOARD)
@@ -1,10 +1,15 @@
 from puzzle import *
 from Solver import *
+from pipeline import generate_scrambles, run_pipeline
 import sys
-import pandas as pd
+import argparse
 from time import time_ns
-import matplotlib.pyplot as plt
-import numpy as np
+
+# pandas, matplotlib and numpy take way longer to import than the solver itself, and solving a single scramble doesn't need any of them, so they only get imported by the commands that use them
+
+ALG_NAMES = {"UCS" : "UCS", "BFS" : "BFS", "BIDI" : "BIDI", "A" : "A*", "PDB" : "PDB", "IDA" : "IDA*", "TABLE" : "TABLE", "WA" : "Weighted A*", "ARA" : "ARA*"} # Names used for each algorithm in the results
+
+WORKER_SOLVERS = {} # Solvers already created in this process, so each worker only has to set up each algorithm once
 
 def run_test(alg,scramble):
     """Solves a scramble with the given Solver object and returns the number of nodes visited and the time in milliseconds taken to solve the puzzle"""
@@ -12,7 +17,70 @@ def run_test(alg,scramble):
     alg.solve(scramble)
     end = time_ns()/1000000
     elapsed = end - start
-    return len(alg.visited),elapsed
+    return alg.nodes_expanded,elapsed
+
+def run_batch_job(seed,chunk,count,alg,table=None):
+    """Runs one batch job in a worker process: generates a chunk of scrambles and solves all of them with one algorithm
+
+    Args:
+        seed (int): Seed for the whole run
+        chunk (int): Index of the chunk
+        count (int): Number of scrambles in the chunk
+        alg (str): Algorithm to solve them with
+        table (str): File the state table for "TABLE" was saved to by the main process, so the workers only ever load it
+
+    Returns:
+        tuple: (chunk, alg, scrambles, nodes, times) where nodes and times are lists with one value per scramble
+    """
+    if alg not in WORKER_SOLVERS:
+        WORKER_SOLVERS[alg] = Solver(alg,table=table,trace=False) # The trace log only runs in the main process, so there's nothing to send the solutions to
+    solver = WORKER_SOLVERS[alg]
+    scrambles = generate_scrambles(seed,chunk,count)
+    nodes = []
+    times = []
+    for scramble in scrambles:
+        n,t = run_test(solver,scramble)
+        nodes.append(n)
+        times.append(t)
+    return chunk,alg,scrambles,nodes,times
+
+def run_batch(num_scrambles,algs,workers,seed,chunk_size=100):
+    """Solves num_scrambles scrambles with each algorithm, spreading the work over a pool of processes. Every (chunk of scrambles, algorithm) pair is its own job so all the cores stay busy even when one algorithm is way slower than the others.
+
+    Args:
+        num_scrambles (int): Number of scrambles to solve
+        algs (list[str]): Algorithms to solve them with
+        workers (int): Number of worker processes
+        seed (int): Seed for generating the scrambles
+        chunk_size (int): Number of scrambles in each job
+
+    Returns:
+        DataFrame: One row per scramble with the nodes and time of each algorithm, in the same format as the normal run
+    """
+    import pandas as pd
+    from concurrent.futures import ProcessPoolExecutor
+    chunk_counts = [min(chunk_size,num_scrambles-start) for start in range(0,num_scrambles,chunk_size)]
+    columns = {"Scramble" : [None]*len(chunk_counts)}
+    for alg in algs:
+        columns[f"Nodes {ALG_NAMES[alg]}"] = [None]*len(chunk_counts)
+        columns[f"Time {ALG_NAMES[alg]}"] = [None]*len(chunk_counts)
+
+    table = None
+    if "TABLE" in algs: # Build the table here first, otherwise every worker would try to build it (and save it to the same file) at once
+        table = StateTable.file_name(DEFAULT_BOARD)
+        StateTable.load_or_build(DEFAULT_BOARD,table)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = [pool.submit(run_batch_job,seed,chunk,count,alg,table) for alg in algs for chunk,count in enumerate(chunk_counts)]
+        for finished,job in enumerate(jobs):
+            chunk,alg,scrambles,nodes,times = job.result()
+            columns["Scramble"][chunk] = scrambles
+            columns[f"Nodes {ALG_NAMES[alg]}"][chunk] = nodes
+            columns[f"Time {ALG_NAMES[alg]}"][chunk] = times
+            print(f"Finished job {finished+1}/{len(jobs)}")
+
+    # Every column is still split up by chunk, so join the chunks together in order and build the DataFrame in one go
+    return pd.DataFrame({name : [value for chunk in chunks for value in chunk] for name,chunks in columns.items()})
 
 # This function was mostly AI generated, but that's mainly because I suck with matplotlib
 def plot_distributions(df, prefix, title,units):
@@ -24,6 +92,8 @@ def plot_distributions(df, prefix, title,units):
         title (str): Title displayed at the top of the graph
         units (str): Units of the column in question
     """
+    import matplotlib.pyplot as plt
+    import numpy as np
     # Filter columns based on prefix
     columns = [col for col in df.columns if col.startswith(prefix)]
     
@@ -33,16 +103,16 @@ def plot_distributions(df, prefix, title,units):
     
     # Plot histograms and bell curves
     plt.figure(figsize=(12, 8))
-    colors = ['#395c78', '#9d312f', '#f08149']  # Hex colors for each algorithm
+    colors = ['#395c78', '#9d312f', '#f08149', '#5b8c5a', '#8e6c8a', '#c9a227']  # Hex colors for each algorithm
 
     for i, column in enumerate(columns):
         # Plot histogram
-        plt.hist(df[column], bins=30, alpha=0.5, color=colors[i], density=True, label=f'{column} Histogram')
+        plt.hist(df[column], bins=30, alpha=0.5, color=colors[i%len(colors)], density=True, label=f'{column} Histogram')
         
         # Plot bell curve
         x = np.linspace(df[column].min(), df[column].max(), 1000)
         y = (1 / (stds[column] * np.sqrt(2 * np.pi))) * np.exp(-0.5 * ((x - means[column]) / stds[column])**2)
-        plt.plot(x, y, color=colors[i], linestyle='dashed', linewidth=2, label=f'{column} Bell Curve')
+        plt.plot(x, y, color=colors[i%len(colors)], linestyle='dashed', linewidth=2, label=f'{column} Bell Curve')
 
     # Add labels and title
     plt.xlabel(f'Value ({units})')
@@ -59,63 +129,51 @@ def plot_distributions(df, prefix, title,units):
     # Show the plot
     plt.show()
 
-if __name__=='__main__':
-    print('hi')
-    random.seed(10)
-    try:
-        num_scrambles = int(sys.argv[1])
-    except:
-        num_scrambles = 10
-
-    data = pd.DataFrame({
-        "Scramble" : [],
-        "Nodes UCS" : [],
-        "Time UCS" : [],
-        "Nodes BFS" : [],
-        "Time BFS" : [],
-        "Nodes A*" : [],
-        "Time A*" : []
-    })
-
-    print(data)
+def run_serial(num_scrambles,algs,seed,chunk_size=100):
+    """Solves num_scrambles scrambles with each algorithm one after the other in this process, printing each one as it goes
+
+    Args:
+        num_scrambles (int): Number of scrambles to solve
+        algs (list[str]): Algorithms to solve them with
+        seed (int): Seed for generating the scrambles
+        chunk_size (int): Number of scrambles generated at once. It needs to match run_batch() for the scrambles to be the same.
+
+    Returns:
+        DataFrame: One row per scramble with the nodes and time of each algorithm
+    """
+    import pandas as pd
+    names = [ALG_NAMES[alg] for alg in algs]
+
+    # Keep every column in a plain list and only make the DataFrame at the end, since adding rows to a DataFrame one at a time gets slower and slower
+    columns = {"Scramble" : []}
+    for name in names:
+        columns[f"Nodes {name}"] = []
+        columns[f"Time {name}"] = []
 
     # Create each solver
-    UCS = Solver()
-    BFS = Solver('BFS')
-    ASTAR = Solver('A')
+    solvers = [Solver(alg) for alg in algs]
 
-    # Create the puzzle that will be used to generate scrambled puzzles
-    Scrambler = Puzzle()
+    # The scrambles come in the same chunks run_batch() uses, so both give the same scrambles for the same seed
     print(f"Now generating {num_scrambles} unique scrambled puzzles...")
-    for i in range(num_scrambles):
-        Scrambler.shuffle()
-        print(f"Solving the puzzle:\n{Scrambler}")
-
-        scramble = Scrambler.get_state_str()
-
-        n_UCS,t_UCS = run_test(UCS,scramble)
-        print(f"UCS solved the puzzle in {t_UCS:.3f}ms and visited {n_UCS} nodes")
-        n_BFS,t_BFS = run_test(BFS,scramble)
-        print(f"BFS solved the puzzle in {t_BFS:.3f}ms and visited {n_BFS} nodes")
-        n_A,t_A = run_test(ASTAR,scramble)
-        print(f"A* solved the puzzle in {t_A:.3f}ms and visited {n_A} nodes")
-
-        # Create row of data
-        new_row = pd.Series({
-            "Scramble" : scramble,
-            "Nodes UCS" : n_UCS,
-            "Time UCS" : t_UCS,
-            "Nodes BFS" : n_BFS,
-            "Time BFS" : t_BFS,
-            "Nodes A*" : n_A,
-            "Time A*" : t_A
-        })
-        data.loc[len(data)] = new_row
+    for chunk,start in enumerate(range(0,num_scrambles,chunk_size)):
+        for scramble in generate_scrambles(seed,chunk,min(chunk_size,num_scrambles-start)):
+            print(f"Solving the puzzle:\n{Puzzle(scramble)}")
+            columns["Scramble"].append(scramble)
 
+            for name,solver in zip(names,solvers):
+                n,t = run_test(solver,scramble)
+                print(f"{name} solved the puzzle in {t:.3f}ms and visited {n} nodes")
+                columns[f"Nodes {name}"].append(n)
+                columns[f"Time {name}"].append(t)
+
+    return pd.DataFrame(columns)
+
+def print_results(data,names):
+    """Prints the worst, best and average nodes and time of each algorithm"""
     print("==================\n" + 
           "--Final Results--\n" +
           "==================")
-    for alg in ["UCS","BFS","A*"]:
+    for alg in names:
         node_data = data[f"Nodes {alg}"]
         time_data = data[f"Time {alg}"]
         print(f"\n{alg}:")
@@ -128,11 +186,117 @@ if __name__=='__main__':
         print(f"\t\tWorst: {time_data.max():.3f}ms")
         print(f"\t\tBest: {time_data.min():.3f}ms")
         print(f"\t\tAverage: {time_data.mean():.3f}ms")
-        
-    # Matplotlib stuff
 
+def plot_results(data):
+    """Shows the distribution graphs for the nodes and the time of each algorithm"""
     plot_distributions(data,"Nodes","Distribution of the Number of Nodes Visited by Each Algorithm","Nodes")
     plot_distributions(data,"Time","Distribution of Time Taken to solve with each algorithm","ms")
-        
-    data.to_csv("Tests.csv")
 
+def command_solve(args):
+    """Solves the scrambles given on the command line and prints one solution per line. This is the one to use when calling the solver from another program, since it doesn't import anything it doesn't need."""
+    solver = Solver(args.alg,rows=args.rows,cols=args.cols,layout=args.layout,trace=False,weight=args.weight,time_limit=args.time_limit,node_limit=args.node_limit)
+    for scramble in args.scrambles:
+        solution = solver.solve(scramble)
+        if args.show_bound and solver.bound is not None:
+            print(f"{solution} {solver.bound:.3f}")
+        else:
+            print(solution)
+
+def command_bench(args):
+    """Solves a bunch of scrambles with each algorithm and compares them (what main.py always used to do)"""
+    from batch_heuristics import batch_features, states_from_strings
+    start_trace_log()
+    names = [ALG_NAMES[alg] for alg in args.algs]
+    if args.workers:
+        print(f"Now solving {args.num_scrambles} scrambled puzzles with {args.workers} workers...")
+        data = run_batch(args.num_scrambles,args.algs,args.workers,args.seed)
+    else:
+        data = run_serial(args.num_scrambles,args.algs,args.seed)
+
+    # Add how hard each scramble looks to the heuristics, so they can be compared against how long it actually took to solve
+    features = batch_features(states_from_strings(data["Scramble"]))
+    for feature in ["Hamming","Manhattan","Nilsson","Inversions"]:
+        data[feature] = features[feature]
+
+    print_results(data,names)
+    if not(args.no_plot):
+        plot_results(data)
+    data.to_csv(args.csv)
+
+def command_stream(args):
+    """Like bench, but the results get written to a file in chunks as they come in (with a checkpoint so the run can be resumed) instead of being kept in memory, and the summary is worked out as it goes. Good for runs that are too long for bench."""
+    start_trace_log()
+    print(f"Now solving {args.num_scrambles} scrambled puzzles, saving the results to {args.output}...")
+    sink = run_pipeline(args.output,args.num_scrambles,args.algs,args.seed,ALG_NAMES,args.depths,format=args.format,chunk_size=args.chunk_size,resume=args.resume)
+    print("==================\n" + 
+          "--Final Results--\n" +
+          "==================")
+    for alg in args.algs:
+        name = ALG_NAMES[alg]
+        print(f"\n{name}:")
+        for column,label,units,spec in [("Nodes","Number of Nodes visited","","d"),("Time","Time taken to solve","ms",".3f"),("Moves","Solution length","","d")]:
+            stats = sink.stats[f"{column} {name}"]
+            print(f"\t{label}:")
+            if stats.count == 0: # Nothing got solved, so there's no best or worst
+                print("\t\tNo results")
+                continue
+            print(f"\t\tWorst: {stats.max:{spec}}{units}")
+            print(f"\t\tBest: {stats.min:{spec}}{units}")
+            print(f"\t\tAverage: {stats.mean:.3f}{units} (σ={stats.std():.3f})")
+
+def command_plot(args):
+    """Shows the graphs for results that were already saved by the bench command"""
+    import pandas as pd
+    data = pd.read_csv(args.csv,index_col=0)
+    plot_results(data)
+
+COMMANDS = {"solve" : command_solve, "bench" : command_bench, "stream" : command_stream, "plot" : command_plot}
+
+def build_parser() -> argparse.ArgumentParser:
+    """Builds the argument parser with a subcommand for each of COMMANDS"""
+    parser = argparse.ArgumentParser(description="Solves sliding puzzles and compares the search algorithms")
+    commands = parser.add_subparsers(dest="command",required=True)
+
+    solve = commands.add_parser("solve",help="Solve scrambles and print their solutions, one per line")
+    solve.add_argument("scrambles",nargs="+",help="States to solve, e.g. 412367580")
+    solve.add_argument("--alg",default="A",choices=list(ALG_NAMES))
+    solve.add_argument("--rows",type=int,default=3)
+    solve.add_argument("--cols",type=int,default=None,help="Defaults to the same as rows")
+    solve.add_argument("--layout",default="spiral",choices=["spiral","row"])
+    solve.add_argument("--weight",type=float,default=2.0,help="Weight on the heuristic for WA (and the starting weight for ARA)")
+    solve.add_argument("--time-limit",type=float,default=None,help="Seconds ARA gets to improve its solution")
+    solve.add_argument("--node-limit",type=int,default=None,help="Nodes ARA can expand to improve its solution")
+    solve.add_argument("--show-bound",action="store_true",help="Print how many times longer than the shortest solution each solution could be after it (WA and ARA only)")
+
+    bench = commands.add_parser("bench",help="Solve a bunch of scrambles with each algorithm and compare them")
+    bench.add_argument("num_scrambles",type=int,nargs="?",default=10)
+    bench.add_argument("--workers",type=int,default=None,help="Run in batch mode with this many worker processes")
+    bench.add_argument("--seed",type=int,default=10,help="Seed for generating the scrambles")
+    bench.add_argument("--algs",nargs="+",default=["UCS","BFS","A"],choices=list(ALG_NAMES),help="Algorithms to compare")
+    bench.add_argument("--no-plot",action="store_true",help="Don't show the graphs at the end")
+    bench.add_argument("--csv",default="Tests.csv",help="Where to save the results")
+
+    stream = commands.add_parser("stream",help="Like bench, but writes the results as it goes and can resume a run that got interrupted")
+    stream.add_argument("num_scrambles",type=int)
+    stream.add_argument("--output",default="Tests.csv",help="CSV file (or directory for Parquet) to write the results to")
+    stream.add_argument("--format",default="csv",choices=["csv","parquet"],help="Parquet needs pyarrow")
+    stream.add_argument("--seed",type=int,default=10,help="Seed for generating the scrambles")
+    stream.add_argument("--algs",nargs="+",default=["UCS","BFS","A"],choices=list(ALG_NAMES),help="Algorithms to compare")
+    stream.add_argument("--depths",nargs="+",type=int,default=None,help="Only use scrambles with these shortest solution lengths, in equal shares")
+    stream.add_argument("--chunk-size",type=int,default=1000,help="Number of results written (and checkpointed) at once")
+    stream.add_argument("--resume",action="store_true",help="Carry on from the last checkpoint of the same output")
+
+    plot = commands.add_parser("plot",help="Show the graphs for results saved by bench")
+    plot.add_argument("csv",nargs="?",default="Tests.csv")
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Running it without a command (like python main.py 100) still means bench, like it always has
+    if not(argv) or (argv[0] not in COMMANDS and argv[0] not in ["-h","--help"]):
+        argv = ["bench"] + argv
+    args = build_parser().parse_args(argv)
+    COMMANDS[args.command](args)
+
+if __name__=='__main__':
+    main()
@@ -0,0 +1,148 @@
+import os
+import json
+import argparse
+from collections import deque
+import numpy as np
+from puzzle import *
+
+def default_patterns(board) -> list:
+    """Splits the tiles of the board into groups of at most 4 tiles that are next to each other when solved (e.g. [1,2,3,4] and [5,6,7,8] for the 8-puzzle)"""
+    tiles = list(range(1,board.size))
+    return [tiles[i:i+4] for i in range(0,len(tiles),4)]
+
+class PatternDatabase:
+    """
+    A class for pattern database heuristics. A pattern is a group of tiles, and its database stores how many moves it takes to get those tiles to their solved positions from every placement they could be in, ignoring all the other tiles. They get built by a breadth-first search going backwards from the solved state, which only has to happen once, so they're saved to disk and memory-mapped when they get loaded. That way loading them is instant and several processes using the same files share the memory.
+    When the database is additive, only the moves of the pattern's own tiles are counted, so if the patterns don't share any tiles, their values can be added together and it still never overestimates. Otherwise every move counts and we can only take the biggest value.
+
+    Attributes:
+        board (Board): Board the database was built for
+        patterns (list[list[int]]): The tiles in each pattern
+        tables (list[ndarray]): tables[i][rank_placement(positions of patterns[i])] is the number of moves for pattern i
+        additive (bool): Whether the values of the patterns get added (True) or maxed (False)
+    """
+
+    def __init__(self,board,patterns,tables,additive=True):
+        self.board = board
+        self.patterns = [list(pattern) for pattern in patterns]
+        self.tables = tables
+        self.additive = additive
+        # Looking up single values through a memoryview gives back plain ints, which is way faster than indexing a numpy array one item at a time
+        self.lookups = [memoryview(table) for table in tables]
+
+    @staticmethod
+    def build(board,patterns=None,additive=True):
+        """Builds a pattern database by searching backwards from the solved state
+
+        Args:
+            board (Board): Board to build it for
+            patterns (list[list[int]]): The tiles in each pattern. Defaults to default_patterns(board).
+            additive (bool): Whether to only count the moves of the pattern's own tiles
+
+        Returns:
+            PatternDatabase: The new pattern database
+        """
+        if patterns is None:
+            patterns = default_patterns(board)
+        tiles = [tile for pattern in patterns for tile in pattern]
+        if 0 in tiles or len(tiles) != len(set(tiles)) or not set(tiles) <= set(range(board.size)):
+            raise Exception("Patterns can only have tiles from the board (not 0) and can't share tiles")
+        tables = [PatternDatabase.build_table(board,pattern,additive) for pattern in patterns]
+        return PatternDatabase(board,patterns,tables,additive)
+
+    @staticmethod
+    def build_table(board,pattern,additive=True):
+        """Builds the table for one pattern. The search has to keep track of where the empty space is too since that decides which tiles can move, but once it's done we only keep the best value over all the empty space positions.
+
+        Args:
+            board (Board): Board to build it for
+            pattern (list[int]): The tiles in the pattern
+            additive (bool): Whether moving a tile that isn't in the pattern is free
+
+        Returns:
+            ndarray: uint8 array with one value per placement of the pattern's tiles
+        """
+        size = board.size
+        k = len(pattern)
+        free_squares = size - k
+        # The search states are the positions of the pattern's tiles followed by the empty space's position. Ranking those gives pattern_rank*free_squares + (rank of the empty space among the free squares), which makes it easy to squash the empty space out at the end.
+        distances = bytearray(b"\xff")*placement_count(size,k+1)
+        start = tuple(pattern) + (0,) # Every tile is in its own position when solved
+        distances[rank_placement(start,size)] = 0
+        queue = deque([(start,0)])
+        while queue:
+            positions,distance = queue.popleft()
+            if distance > distances[rank_placement(positions,size)]: # We already found a better way to get here
+                continue
+            empty = positions[-1]
+            for square in board.neighbors[empty]:
+                if square in positions: # One of the pattern's tiles moves into the empty space
+                    i = positions.index(square)
+                    next_positions = positions[:i] + (empty,) + positions[i+1:-1] + (square,)
+                    next_distance = distance + 1
+                else: # Some other tile moves, which is free if the database is additive
+                    next_positions = positions[:-1] + (square,)
+                    next_distance = distance if additive else distance + 1
+                rank = rank_placement(next_positions,size)
+                if next_distance < distances[rank]:
+                    distances[rank] = next_distance
+                    # Free moves go to the front so the queue stays in order of distance (0-1 BFS)
+                    if next_distance == distance:
+                        queue.appendleft((next_positions,next_distance))
+                    else:
+                        queue.append((next_positions,next_distance))
+        return np.frombuffer(distances,dtype=np.uint8).reshape(-1,free_squares).min(axis=1)
+
+    def heuristic(self,state) -> int:
+        """Returns the pattern database estimate of the number of moves to solve a state list"""
+        where = [0]*len(state) # where[piece] is the position of that piece
+        for position,piece in enumerate(state):
+            where[piece] = position
+        size = self.board.size
+        values = [lookup[rank_placement([where[tile] for tile in pattern],size)] for pattern,lookup in zip(self.patterns,self.lookups)]
+        return sum(values) if self.additive else max(values)
+
+    def save(self,directory):
+        """Saves the database to a directory as one flat .npy file per pattern plus a manifest.json describing the board and the patterns"""
+        os.makedirs(directory,exist_ok=True)
+        manifest = {
+            "rows" : self.board.rows,
+            "cols" : self.board.cols,
+            "layout" : self.board.layout,
+            "additive" : self.additive,
+            "patterns" : self.patterns
+        }
+        for i,table in enumerate(self.tables):
+            np.save(os.path.join(directory,f"pattern_{i}.npy"),np.ascontiguousarray(table,dtype=np.uint8))
+        with open(os.path.join(directory,"manifest.json"),"w") as file:
+            json.dump(manifest,file)
+
+    @staticmethod
+    def load(directory):
+        """Loads a database saved by save(). The tables are memory-mapped instead of read, so only the pages that actually get used are loaded."""
+        with open(os.path.join(directory,"manifest.json")) as file:
+            manifest = json.load(file)
+        board = get_board(manifest["rows"],manifest["cols"],manifest["layout"])
+        tables = []
+        for i,pattern in enumerate(manifest["patterns"]):
+            table = np.load(os.path.join(directory,f"pattern_{i}.npy"),mmap_mode="r")
+            if table.dtype != np.uint8 or table.shape != (placement_count(board.size,len(pattern)),):
+                raise Exception(f"pattern_{i}.npy doesn't match the pattern {pattern} in the manifest")
+            tables.append(table)
+        return PatternDatabase(board,manifest["patterns"],tables,manifest["additive"])
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Builds a pattern database and saves it to a directory")
+    parser.add_argument("directory",help="Where to save the database")
+    parser.add_argument("--rows",type=int,default=3)
+    parser.add_argument("--cols",type=int,default=None,help="Defaults to the same as rows")
+    parser.add_argument("--layout",default="spiral",choices=["spiral","row"])
+    parser.add_argument("--pattern",action="append",help="Comma separated tiles in a pattern, e.g. 1,2,3,4. Can be given more than once. Defaults to groups of 4 tiles.")
+    parser.add_argument("--max",action="store_true",help="Count every move and take the max of the patterns instead of adding them")
+    args = parser.parse_args()
+
+    board = get_board(args.rows,args.cols if args.cols else args.rows,args.layout)
+    patterns = [[int(tile) for tile in pattern.split(",")] for pattern in args.pattern] if args.pattern else None
+    database = PatternDatabase.build(board,patterns,additive=not(args.max))
+    database.save(args.directory)
+    print(f"Saved {len(database.patterns)} patterns ({sum(table.size for table in database.tables)} entries) to {args.directory}")
@@ -0,0 +1,388 @@
+import os
+import csv
+import json
+import math
+from time import time_ns
+from puzzle import *
+from Solver import Solver
+from state_table import StateTable
+
+# main.py's bench command keeps every result in a DataFrame until the very end, so a crash loses everything and the memory keeps growing with the number of scrambles. This does the same kind of run as a pipeline of generators instead: scrambles come out of scramble_source() one at a time, solve_results() solves them, and a ResultSink writes the rows out in chunks and saves a checkpoint after each one, so a run can be as long as you want and pick up where it left off if it gets killed.
+
+def generate_scrambles(seed,chunk,count,num_moves=31):
+    """Generates a chunk of scrambles. Each chunk gets its own random number generator seeded by (seed, chunk), so the scrambles are the same no matter which worker makes them or how many workers there are.
+
+    Args:
+        seed (int): Seed for the whole run
+        chunk (int): Index of the chunk
+        count (int): Number of scrambles in the chunk
+        num_moves (int): Number of random moves in each scramble
+
+    Returns:
+        list[str]: The scrambles
+    """
+    rng = random.Random(f"{seed}-{chunk}")
+    scrambler = Puzzle()
+    scrambles = []
+    for i in range(count):
+        scrambler.shuffle(num_moves,rng)
+        scrambles.append(scrambler.get_state_str())
+    return scrambles
+
+def depth_scrambles(rng,depths,table):
+    """Yields random scrambles along with the length of their shortest solution, forever. Each one is a random walk from the solved state with a random length (so there are plenty of both shallow and deep ones), and its depth gets looked up in a StateTable. Scrambles that aren't at one of the depths get skipped.
+
+    Args:
+        rng (random.Random): Random number generator for the walks. Nothing else uses it between scrambles, so saving its state is enough to carry on from the same place later.
+        depths (list[int]): Shortest solution lengths to keep
+        table (StateTable): Table for the board (see StateTable.load_or_build())
+
+    Yields:
+        tuple: (scramble, depth)
+    """
+    board = table.board
+    counts = table.depth_counts()
+    for depth in depths:
+        if depth < 0 or depth >= len(counts):
+            raise Exception(f"No {board.rows}x{board.cols} scramble takes {depth} moves to solve. The most any of them take is {len(counts)-1}.")
+    wanted = set(depths)
+    puzzle = Puzzle(rows=board.rows,cols=board.cols,layout=board.layout,track_heuristics=False)
+    while True:
+        puzzle.set_state_int(board.solved_int)
+        puzzle.shuffle(rng.randint(max(min(depths),1),80),rng)
+        depth = table.distance(puzzle.state)
+        if depth in wanted:
+            yield puzzle.get_state_str(),depth
+
+def scramble_source(seed,count=None,start=0,num_moves=31,depths=None,chunk_size=1000,source=None):
+    """Yields (index, scramble, depth) for a run, one at a time. The same seed always gives the same scrambles in the same order.
+
+    Args:
+        seed (int): Seed for the whole run
+        count (int): Number of scrambles to yield in total (counting the ones skipped by start). None keeps going forever.
+        start (int): Index of the first scramble to yield, for picking up a run where it left off
+        num_moves (int): Number of random moves in each scramble (when depths isn't given)
+        depths (list[int]): If given, the scrambles cycle through these shortest solution lengths so each one gets the same share (see DepthSource)
+        chunk_size (int): Number of scrambles generated at once (when depths isn't given)
+        source (DepthSource): Source to take the scrambles from when depths is given, which might already be part way through. Defaults to a new one.
+
+    Yields:
+        tuple: (index, scramble, depth) where depth is the length of the shortest solution, or None if depths wasn't given
+    """
+    if depths is None:
+        # Scrambles are made in chunks with generate_scrambles(), so starting part way through only means regenerating the one chunk it starts in
+        index = start
+        while count is None or index < count:
+            chunk = index//chunk_size
+            scrambles = generate_scrambles(seed,chunk,chunk_size,num_moves)
+            for scramble in scrambles[index%chunk_size:]:
+                if count is not None and index >= count:
+                    return
+                yield index,scramble,None
+                index += 1
+        return
+
+    # The order of depth scrambles depends on everything that came before them, so starting part way through means either carrying on from a saved source or generating (and skipping) all the scrambles before start
+    if source is None:
+        source = DepthSource(seed,depths)
+    while source.index < start:
+        source.next()
+    while count is None or source.index < count:
+        yield source.next()
+
+class DepthSource:
+    """
+    A class that hands out scrambles cycling through a list of shortest solution lengths, so each one gets the same share. The candidates come from depth_scrambles(). The ones that came out at a different depth than the one we were looking for get saved for when that depth comes up, but only up to buffer_size of them per depth so the memory stays the same however long the run is. Scrambles can repeat, since some depths only have a handful of states.
+    Everything it depends on fits in get_state(), so ResultSink saves it in each checkpoint and a resumed run carries on from there instead of generating every scramble before it again.
+
+    Attributes:
+        depths (list[int]): Depths to cycle through
+        buffer_size (int): Most scrambles to keep for each depth
+        index (int): Index of the next scramble
+        rng (random.Random): Random number generator for the candidates
+        found (dict): Scrambles waiting to be handed out, for each depth
+    """
+
+    def __init__(self,seed,depths,buffer_size=100,table=None):
+        """Initializes a DepthSource object
+
+        Args:
+            seed (int): Seed for the whole run
+            depths (list[int]): Depths to cycle through
+            buffer_size (int): Most scrambles to keep for each depth
+            table (StateTable): Table to look the depths up in. Defaults to the one for the 8-puzzle (see StateTable.load_or_build()).
+        """
+        self.depths = list(depths)
+        self.buffer_size = buffer_size
+        self.index = 0
+        self.rng = random.Random(f"{seed}-depths")
+        self.found = {depth : [] for depth in self.depths}
+        self.candidates = depth_scrambles(self.rng,self.depths,table or StateTable.load_or_build(DEFAULT_BOARD))
+
+    def next(self) -> tuple:
+        """Returns the next (index, scramble, depth)"""
+        depth = self.depths[self.index%len(self.depths)]
+        while not(self.found[depth]):
+            scramble,scramble_depth = next(self.candidates)
+            if len(self.found[scramble_depth]) < self.buffer_size:
+                self.found[scramble_depth].append(scramble)
+        index = self.index
+        self.index += 1
+        return index,self.found[depth].pop(0),depth
+
+    def get_state(self) -> dict:
+        """Returns everything needed to carry on from here with set_state(), in a form that can be saved as JSON"""
+        return {
+            "depths" : self.depths,
+            "index" : self.index,
+            "rng" : self.rng.getstate(),
+            "found" : [self.found[depth] for depth in self.depths]
+        }
+
+    def set_state(self,state):
+        """Carries on from a state saved by get_state()"""
+        if state["depths"] != self.depths:
+            raise Exception("The saved scramble source is for different depths")
+        self.index = state["index"]
+        version,internal,gauss = state["rng"] # JSON turns the tuples into lists, so they have to be turned back
+        self.rng.setstate((version,tuple(internal),gauss))
+        self.found = {depth : list(scrambles) for depth,scrambles in zip(self.depths,state["found"])}
+
+def solve_results(scrambles,algs,names=None):
+    """Solves each scramble that comes out of scramble_source() with every algorithm
+
+    Args:
+        scrambles (iterable): (index, scramble, depth) tuples from scramble_source()
+        algs (list[str]): Algorithms to solve them with
+        names (dict): Name to use for each algorithm in the columns. Defaults to the algorithm itself.
+
+    Yields:
+        dict: One row per scramble with its index, the scramble, its depth, and the nodes, time (ms) and solution length of each algorithm
+    """
+    names = names or {}
+    solvers = [(names.get(alg,alg),Solver(alg,trace=False)) for alg in algs]
+    for index,scramble,depth in scrambles:
+        row = {"Index" : index,"Scramble" : scramble,"Depth" : depth}
+        for name,solver in solvers:
+            start = time_ns()
+            solution = solver.solve(scramble)
+            row[f"Time {name}"] = (time_ns()-start)/1000000
+            row[f"Nodes {name}"] = solver.nodes_expanded
+            row[f"Moves {name}"] = len(solution)
+        yield row
+
+def result_columns(algs,names=None) -> list:
+    """Returns the columns of the rows made by solve_results(), in order"""
+    names = names or {}
+    columns = ["Index","Scramble","Depth"]
+    for alg in algs:
+        name = names.get(alg,alg)
+        columns += [f"Time {name}",f"Nodes {name}",f"Moves {name}"]
+    return columns
+
+class RunningStats:
+    """
+    A class to keep the count, mean, standard deviation, best and worst of a column without keeping the values themselves. The mean and variance get updated with Welford's method, which doesn't lose precision the way adding up the squares does.
+
+    Attributes:
+        count (int): Number of values so far
+        mean (float): Mean of the values so far
+        m2 (float): Sum of the squared differences from the mean
+        min (float): Smallest value so far
+        max (float): Biggest value so far
+    """
+
+    def __init__(self,count=0,mean=0.0,m2=0.0,min=None,max=None):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = min
+        self.max = max
+
+    def add(self,value):
+        """Adds a value"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta/self.count
+        self.m2 += delta*(value - self.mean)
+        self.min = value if self.min is None else (value if value < self.min else self.min)
+        self.max = value if self.max is None else (value if value > self.max else self.max)
+
+    def std(self) -> float:
+        """Returns the sample standard deviation (the same one pandas gives)"""
+        return math.sqrt(self.m2/(self.count-1)) if self.count > 1 else 0.0
+
+    def to_dict(self) -> dict:
+        """Returns everything needed to rebuild it with RunningStats(**dict), for saving in a checkpoint"""
+        return {"count" : self.count,"mean" : self.mean,"m2" : self.m2,"min" : self.min,"max" : self.max}
+
+class ResultSink:
+    """
+    A class that writes rows to a CSV file or a Parquet dataset in chunks, and saves a checkpoint after each chunk so the run can be resumed. It also keeps RunningStats for every Time, Nodes and Moves column, so the summary at the end doesn't need the rows.
+    The checkpoint is a JSON file next to the output that says how many rows were written, how big the file was at that point (for CSV), the stats and where the scramble source was (if there is one). A crash can happen between writing a chunk and saving the checkpoint, so when resuming, anything written after the checkpoint gets thrown away and redone.
+    Parquet files can't be appended to, so a Parquet dataset is a directory with one part file per chunk. It needs pyarrow, which only gets imported if Parquet is used.
+
+    Attributes:
+        path (str): The CSV file or Parquet directory
+        columns (list[str]): Columns of each row
+        format (str): "csv" or "parquet"
+        chunk_size (int): Number of rows to write at once
+        source (DepthSource): Source the scrambles come from, or None if they don't need saving (see scramble_source())
+        checkpoint_path (str): Where the checkpoint is saved
+        rows_written (int): Rows written and checkpointed so far
+        parts (int): Parquet part files written so far
+        stats (dict): RunningStats for each Time, Nodes and Moves column
+        buffer (list): Rows that haven't been written yet
+    """
+
+    def __init__(self,path,columns,format="csv",chunk_size=1000,resume=False,source=None):
+        """Initializes a ResultSink object
+
+        Args:
+            path (str): The CSV file or Parquet directory to write to
+            columns (list[str]): Columns of each row
+            format (str): "csv" or "parquet"
+            chunk_size (int): Number of rows to write at once
+            resume (bool): Whether to carry on from the checkpoint (if there is one) instead of starting over
+            source (DepthSource): Optional source the rows' scrambles come from. Its state gets saved in each checkpoint, and it gets put back to the saved state when resuming.
+        """
+        if format not in ["csv","parquet"]:
+            raise Exception(f"Unknown format {format}. It needs to be either csv or parquet")
+        self.path = path
+        self.columns = list(columns)
+        self.format = format
+        self.chunk_size = chunk_size
+        self.source = source
+        self.checkpoint_path = path.rstrip("/\\") + ".checkpoint.json"
+        self.rows_written = 0
+        self.parts = 0
+        self.csv_bytes = 0
+        self.stats = {column : RunningStats() for column in self.columns if column.split(" ")[0] in ["Time","Nodes","Moves"]}
+        self.buffer = []
+        if resume and os.path.exists(self.checkpoint_path):
+            self.load_checkpoint()
+        else:
+            self.start_over()
+
+    def start_over(self):
+        """Clears out anything left from an earlier run"""
+        if self.format == "csv":
+            with open(self.path,"w",newline="") as file:
+                csv.writer(file).writerow(self.columns)
+                self.csv_bytes = file.tell()
+        else:
+            os.makedirs(self.path,exist_ok=True)
+            for name in os.listdir(self.path):
+                if name.startswith("part-") and name.endswith(".parquet"):
+                    os.remove(os.path.join(self.path,name))
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def load_checkpoint(self):
+        """Picks up from the checkpoint, throwing away anything that was written after it was saved"""
+        with open(self.checkpoint_path) as file:
+            checkpoint = json.load(file)
+        if checkpoint["columns"] != self.columns or checkpoint["format"] != self.format:
+            raise Exception(f"{self.checkpoint_path} is from a run with different columns or a different format, so it can't be resumed")
+        self.rows_written = checkpoint["rows_written"]
+        self.parts = checkpoint["parts"]
+        self.csv_bytes = checkpoint["csv_bytes"]
+        self.stats = {column : RunningStats(**stats) for column,stats in checkpoint["stats"].items()}
+        if self.source is not None and checkpoint.get("source") is not None:
+            self.source.set_state(checkpoint["source"])
+        if self.format == "csv":
+            with open(self.path,"r+b") as file:
+                file.truncate(self.csv_bytes)
+        else:
+            for name in os.listdir(self.path):
+                if name.startswith("part-") and name.endswith(".parquet") and int(name[5:-8]) >= self.parts:
+                    os.remove(os.path.join(self.path,name))
+
+    def save_checkpoint(self):
+        """Saves the checkpoint. It gets written to a temporary file first and then renamed, so a crash can't leave half a checkpoint behind."""
+        checkpoint = {
+            "columns" : self.columns,
+            "format" : self.format,
+            "rows_written" : self.rows_written,
+            "parts" : self.parts,
+            "csv_bytes" : self.csv_bytes,
+            "stats" : {column : stats.to_dict() for column,stats in self.stats.items()},
+            "source" : None if self.source is None else self.source.get_state() # Every row it handed out has been written by now, so this is exactly where the next row comes from
+        }
+        temporary = self.checkpoint_path + ".tmp"
+        with open(temporary,"w") as file:
+            json.dump(checkpoint,file)
+        os.replace(temporary,self.checkpoint_path)
+
+    def add(self,row):
+        """Adds a row, writing out the buffer once it has chunk_size rows"""
+        self.buffer.append(row)
+        for column,stats in self.stats.items():
+            stats.add(row[column])
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Writes out every buffered row and saves the checkpoint"""
+        if not(self.buffer):
+            return
+        if self.format == "csv":
+            with open(self.path,"a",newline="") as file:
+                writer = csv.DictWriter(file,fieldnames=self.columns)
+                writer.writerows(self.buffer)
+                file.flush()
+                os.fsync(file.fileno())
+                self.csv_bytes = file.tell()
+        else:
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise Exception("Writing Parquet needs pyarrow (pip install pyarrow)")
+            table = pyarrow.Table.from_pylist(self.buffer)
+            pyarrow.parquet.write_table(table,os.path.join(self.path,f"part-{self.parts:05d}.parquet"))
+            self.parts += 1
+        self.rows_written += len(self.buffer)
+        self.buffer = []
+        self.save_checkpoint()
+
+    def close(self):
+        """Writes out whatever is left in the buffer"""
+        self.flush()
+
+def run_pipeline(path,count,algs,seed=10,names=None,depths=None,num_moves=31,format="csv",chunk_size=1000,resume=False) -> ResultSink:
+    """Runs the whole pipeline: generates count scrambles, solves them with each algorithm and writes the results to path
+
+    Args:
+        path (str): The CSV file or Parquet directory to write to
+        count (int): Number of scrambles in the whole run
+        algs (list[str]): Algorithms to solve them with
+        seed (int): Seed for the scrambles
+        names (dict): Name to use for each algorithm in the columns
+        depths (list[int]): Shortest solution lengths to cycle through (see scramble_source())
+        num_moves (int): Number of random moves in each scramble when depths isn't given
+        format (str): "csv" or "parquet"
+        chunk_size (int): Number of rows written (and checkpointed) at once
+        resume (bool): Whether to carry on from the last checkpoint
+
+    Returns:
+        ResultSink: The sink, which has the stats for the whole run
+    """
+    source = DepthSource(seed,depths) if depths else None
+    sink = ResultSink(path,result_columns(algs,names),format,chunk_size,resume,source)
+    if sink.rows_written:
+        print(f"Resuming from scramble {sink.rows_written}")
+    scrambles = scramble_source(seed,count,sink.rows_written,num_moves,depths,source=source)
+    for row in solve_results(scrambles,algs,names):
+        sink.add(row)
+        if sink.rows_written and not(sink.buffer):
+            print(f"Wrote {sink.rows_written}/{count} scrambles")
+    sink.close()
+    return sink
+
+if __name__=="__main__":
+    # Run a small pipeline into a temporary directory and print the summary (test_pipeline.py checks that resuming from a checkpoint gives the same rows and stats)
+    import tempfile
+    sink = run_pipeline(os.path.join(tempfile.mkdtemp(),"results.csv"),25,["A","BFS"],seed=3,chunk_size=10)
+    for column,stats in sink.stats.items():
+        print(f"{column}: mean {stats.mean:.2f}, std {stats.std():.2f}, best {stats.min}, worst {stats.max}")
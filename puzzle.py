@@ -1,21 +1,32 @@
 import random
 import logging
-
-logging.basicConfig(filename='8-puzzle.log', level=logging.INFO, format='%(message)s')
+from trace_log import TRACE, start_trace_log
 
 class Puzzle:
     """
-    A class representing a sliding puzzle that the algorithm will have to solve. The puzzle state is represented as a 9 element long list with each element representing the number at the given position. The indices are laid out like this:
+    A class representing a sliding puzzle that the algorithm will have to solve. The puzzle state is represented as a list with each element representing the number at the given position. By default it's the 8-puzzle and the indices are laid out like this:
     |1|2|3|
     |8|0|4|
     |7|6|5|
     Basically, this just makes it so the solved state is just [0,1,2,3,4,5,6,7,8] making it easier for me to debug and stuff. Maybe there's a better way of approaching this, but this is the easiest approach I can think of.
+    Bigger boards (like the 15-puzzle) work the same way: the positions follow the spiral inwards from the top left corner, and position 0 is the last square of the spiral. They can also use a plain row-major layout instead (see Board).
 
     Attributes:
+        board (Board): Size, layout and lookup tables of the board the puzzle is played on
         state (list): List of integers representing the numbers at each position of the puzzle.
-        COORDS (list): List of pairs representing the matrix coordinates of each piece index. Due to the way I've implemented the puzzle representation, this static variable will help with calculating Manhattan distances.
+        empty (int): Position of the empty space. It gets updated on every move so we never have to search the list for it.
+        state_int (int): The same state packed into a single integer with board.bits bits per position (4 bits for boards up to 4x4). This is what the solver uses internally since ints are way cheaper to hash and compare than strings.
+        hamming (int): Hamming distance of the current state
+        manhattan (int): Total Manhattan distance of the current state
+        sequence (int): Nilsson's sequence part of the Nilsson score (before it gets multiplied by 3)
+        The last three get updated by slide() on every move by only looking at the pieces that moved, so the heuristics never need to be recalculated from scratch during a search.
+        track_heuristics (bool): Whether to keep hamming, manhattan and sequence updated. Turning this off makes moves a bit cheaper when nothing needs the heuristics (like UCS), and the heuristic methods just calculate them from scratch instead.
+        COORDS (list): List of pairs representing the matrix coordinates of each piece index on the default 3x3 board. Due to the way I've implemented the puzzle representation, this static variable will help with calculating Manhattan distances. Other boards get theirs from Board.coords.
+        DIGITS (str): Characters used for each number in state strings and move sequences. The 8-puzzle only needs 0-8, but bigger boards keep going with letters (10 is A, 11 is B, etc.) so every square is still one character.
     """
 
+    DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
     COORDS = [
         (1,1),
         (0,0),
@@ -28,10 +39,24 @@ class Puzzle:
         (1,0)
     ]
 
-    def __init__(self, initial_state=None):
+    def __init__(self, initial_state=None, track_heuristics=True, rows=3, cols=None, layout="spiral"):
         """Initializes a Puzzle object
+
+        Args:
+            initial_state (str): Optional state to start in
+            track_heuristics (bool): Whether to keep the heuristics updated on every move
+            rows (int): Number of rows on the board
+            cols (int): Number of columns on the board. Defaults to the same as rows.
+            layout (str): How positions are numbered, either "spiral" or "row" (see Board)
         """
-        self.state = [0,1,2,3,4,5,6,7,8] # Solved state
+        self.board = get_board(rows,cols if cols else rows,layout)
+        self.track_heuristics = track_heuristics
+        self.state = self.board.solved_state.copy() # Solved state
+        self.empty = 0
+        self.state_int = self.board.solved_int
+        self.hamming = 0
+        self.manhattan = 0
+        self.sequence = 0
         if initial_state:
             self.set_state(initial_state)
 
@@ -41,29 +66,70 @@ class Puzzle:
         Args:
             state_string (str): String representing the new puzzle position
         """
-        if(len(state_string) != 9): raise Exception("state_string must be 9 long")
+        size = self.board.size
+        if(len(state_string) != size): raise Exception(f"state_string must be {size} long")
         try:
-            int_list = [int(x) for x in state_string] # We gotta make sure all the characters are numbers
+            int_list = [int(x,36) for x in state_string] # We gotta make sure all the characters are numbers (or letters for the numbers past 9)
         except:
             raise Exception("All characters need to be an integer")
         
-        # Next make sure all the numbers are unique and are valid pieces in the puzzle (integers 0-8). There is probably a much better way to do this, but this is what I thought of.
-        if((len(int_list) != len(set(int_list))) or (set(int_list) != {0,1,2,3,4,5,6,7,8})): 
-            raise Exception("Integers must be unique and within the range 0 to 8")
+        # Next make sure all the numbers are unique and are valid pieces in the puzzle (integers 0 to size-1). There is probably a much better way to do this, but this is what I thought of.
+        if((len(int_list) != len(set(int_list))) or (set(int_list) != set(range(size)))): 
+            raise Exception(f"Integers must be unique and within the range 0 to {size-1}")
         
         self.state = int_list # Finally, we can set the valid state.
+        self.empty = int_list.index(0)
+        self.state_int = self.board.encode(int_list)
+        if self.track_heuristics:
+            self.recalculate_heuristics()
+
+    def set_state_int(self,state_int:int):
+        """Sets a new state for the puzzle using a packed integer. Unlike set_state(), this does NOT check that the state is valid, so it should only be given integers that came from get_state_int() or encode(). The solver calls this on every expansion, so skipping the validation saves a lot of time.
+
+        Args:
+            state_int (int): Packed integer representing the new puzzle position
+        """
+        self.state = self.board.decode(state_int)
+        self.empty = self.state.index(0)
+        self.state_int = state_int
+        if self.track_heuristics:
+            self.recalculate_heuristics()
+
+    def recalculate_heuristics(self):
+        """Recalculates the hamming, manhattan and sequence attributes from scratch. This only needs to happen when the state gets replaced, since slide() keeps them updated after that."""
+        self.hamming = hamming_distance(self.state)
+        self.manhattan = manhattan_distance(self.state,self.board)
+        self.sequence = nilsson_sequence(self.state,self.board)
 
     def get_state_str(self) -> str:
         """Returns the puzzle state as a string that can be read by set_state()"""
-        return "".join([str(x) for x in self.state])
+        return "".join([Puzzle.DIGITS[x] for x in self.state])
+
+    def get_state_int(self) -> int:
+        """Returns the puzzle state as a packed integer that can be read by set_state_int()"""
+        return self.state_int
+
+    def encode(self,state) -> int:
+        """Packs a list of pieces into a single integer (see Board.encode())"""
+        return self.board.encode(state)
+
+    def decode(self,state_int) -> list:
+        """Unpacks an integer made by encode() back into a list of pieces"""
+        return self.board.decode(state_int)
+
+    def int_to_str(self,state_int) -> str:
+        """Converts a packed integer into the string format used by set_state()"""
+        return "".join([Puzzle.DIGITS[x] for x in self.board.decode(state_int)])
 
     def is_solved(self) -> bool:
         """Returns true if puzzle is solved"""
-        return self.state == [0,1,2,3,4,5,6,7,8]
+        return self.state_int == self.board.solved_int
     
     def get_unsolved_pieces(self) -> int:
         """Returns the number of pieces that are not in their solved position (the Hamming distance). This will be used in the heuristics for the search algorithms."""
-        return sum([x!=y and y!=0 for x,y in enumerate(self.state)])
+        if not self.track_heuristics:
+            return hamming_distance(self.state)
+        return self.hamming
     
     def get_manhattan_distance(self,piece) -> int:
         """Returns the Manhattan distance of the given piece from its correct position
@@ -75,62 +141,40 @@ class Puzzle:
             int: The Manhattan distance of the piece from its final position"""
         if piece==0: return 0 # The empty lot is not counted
         piece_position = self.state.index(piece) # Index position of the piece in the current state of the puzzle
-
-        current_place = Puzzle.COORDS[piece_position] # Matrix coordinates of the piece's current position
-        final_place = Puzzle.COORDS[piece] # Where the piece needs to be
-
-        return abs(current_place[0]-final_place[0]) + abs(current_place[1]-final_place[1])
+        return self.board.manhattan[piece][piece_position]
     
     def total_manhattan_distance(self) -> int:
         """Returns the sum of the Manhattan distances for all the pieces in the puzzle. This will also be used in the heuristics for the search algorithms."""
-        return sum(self.get_manhattan_distance(x) for x in self.state)
+        if not self.track_heuristics:
+            return manhattan_distance(self.state,self.board)
+        return self.manhattan
     
     def nilsson_score(self) -> int:
         """Returns the Nilsson's sequence score for the current state of the puzzle. This function implements it as described in the lecture slides, so I'll include the steps in the docstring to help myself.
         1. Tile in center scores 1 (So basically if the empty lot is not in the center)
         2. For each tile around the center, if the next tile clockwise is not the correct tile, score 2
         3. Multiply the sequence by 3
-        4. Add the total Manhattan distance to the score"""
-        score = 0
-        if self.get_empty_position() != 0: # Means there is a tile in the center
-            score += 1
-        
-        for i in range(1,9): # Skip the center tile
-            current_piece = self.state[i]
-            next_piece = self.state[i%8+1]
-            if current_piece != 0 and next_piece != (current_piece%8 + 1):
-                score += 2
-
-        return 3*score + self.total_manhattan_distance()
+        4. Add the total Manhattan distance to the score
+        On bigger boards, "the center" is position 0 and "around the center" is every other position in order."""
+        if not self.track_heuristics:
+            return nilsson_sequence_score(self.state,self.board)
+        return 3*self.sequence + self.manhattan
 
     def get_empty_position(self) ->  int:
         """Returns the position of the empty space in the puzzle"""
-        return self.state.index(0)
+        return self.empty
     
     def is_solvable(self) -> bool:
         """Returns true if it is solvable"""
-        return self.count_inversions()%2 != 0 # Since the solved state has odd parity, the current state needs to be odd too in order to be solvable. 
+        # Each move either keeps the inversion parity the same (sideways) or changes it by cols-1 (up and down). When the width is odd, that means the inversion parity never changes, so the current state needs the same parity as the solved state. When the width is even, up and down moves flip it, but they also change the row of the empty space, so the parity of the two added together never changes instead.
+        parity = self.count_inversions()
+        if self.board.cols%2 == 0:
+            parity += self.board.coords[self.empty][0]
+        return parity%2 == self.board.solved_parity
     
     def count_inversions(self) -> int:
         """Counts the number of inversions to help determine if the puzzle is solvable from the current state"""
-        # Due to the way I've implemented the puzzle, finding the row-major order of the pieces is a bit unnatural, but it should work fine
-        placements = [1,2,3,8,0,4,7,6,5]
-        row_major_order = []
-        count = 0
-
-        for position in placements:
-            if self.state[position] != 0: # Empty space isn't included
-                row_major_order.append(self.state[position])
-
-        # I could definitely have made this much neater with list comprehensions, but this makes it easier for me to compare to the example I looked at
-        for i in range(len(row_major_order)):
-            for j in range(i+1,len(row_major_order)):
-                first_square = row_major_order[i]
-                second_square = row_major_order[j]
-                if first_square > second_square:
-                    count += 1
-
-        return count
+        return count_inversions(self.state,self.board)
 
     def list_valid_moves(self):
         """Provides a list of valid indices to move the current empty space to. Technically, it's the squares that can move into the empty space, but it is much easier to imagine the empty space being the one that's moving.
@@ -139,20 +183,7 @@ class Puzzle:
             list[int]: List of valid moves given the current position of the puzzle.
         """
 
-        position = self.state.index(0) # Find where the empty space is
-
-        if position == 0:
-            return [2,4,6,8] # If the empty space is in the middle, any of the even numbered squares can move to it
-        
-        # When the empty lot is not in the center, the next and previous squares in the spiral are valid positions
-        next_square = position%8 + 1
-        prev_square = position - 1 if position > 1 else 8 # There is probably a better way to do this, but this was the only way I could think of making sure the position previous to 1 is always 8
-        
-        # Even-numbered spaces can always move to position 0, so we always include it in the valid moves. Otherwise, the only valid moves are the next and previous squares in the spiral.
-        if position%2 == 0:
-            return [0,prev_square,next_square]
-        else:
-            return [prev_square,next_square]
+        return list(self.board.neighbors[self.empty]) # Copy it since callers like to remove moves from the list
         
     def move(self,position:int):
         """If possible, moves whatever number is in the provided position into the empty space. More specifically, it swaps wherever 0 is in the list to the position argument as long as it is a valid move.
@@ -161,50 +192,420 @@ class Puzzle:
             position (int): Position to swap with the empty space. Raises an error if the move is invalid.
         """
         valid_moves = self.list_valid_moves()
-        empty_lot = self.state.index(0) # Position of the empty space (i.e. the element with value 0)
+        empty_lot = self.empty # Position of the empty space (i.e. the element with value 0)
         if not(position in valid_moves):
             raise Exception(f"Invalid move. Square [{self.state[position]}] at position {position} cannot move into the empty space at position {empty_lot}")
         
+        self.slide(position)
+
+    def slide(self,position:int):
+        """Moves whatever number is in the provided position into the empty space WITHOUT checking if the move is valid. This is the fast path used by the solver, which only ever passes positions it got from list_valid_moves().
+
+        Args:
+            position (int): Position to swap with the empty space
+        """
+        self.state_int,self.hamming,self.manhattan,self.sequence = self.peek(position)
         # Swap the values
-        self.state[empty_lot],self.state[position] = self.state[position],self.state[empty_lot]
+        self.state[self.empty] = self.state[position]
+        self.state[position] = 0
+        self.empty = position
+
+    def peek(self,position:int) -> tuple:
+        """Works out what the state and heuristics would be after moving the piece in the provided position into the empty space, without actually moving it. Like slide(), this doesn't check if the move is valid. The solver uses this to create the next nodes without having to move the puzzle back and forth for every one of them.
+
+        Args:
+            position (int): Position to swap with the empty space
+
+        Returns:
+            tuple: (state_int, hamming, manhattan, sequence) after the move, in the same format as snapshot(). If track_heuristics is off, the heuristics are just whatever they were before.
+        """
+        state = self.state
+        board = self.board
+        empty_lot = self.empty
+        piece = state[position]
+        # The empty space is 0, so moving the piece in the packed integer is just taking it out of one slot and adding it to the other
+        state_int = self.state_int + (piece << (board.bits*empty_lot)) - (piece << (board.bits*position))
+        if not self.track_heuristics:
+            return (state_int,self.hamming,self.manhattan,self.sequence)
+        # Only the pairs around the center that include one of the two squares can change their Nilsson score, so we take those out before the move and add them back after
+        nilsson_pair = board.nilsson_pair
+        pairs = board.move_pairs[empty_lot][position]
+        sequence = self.sequence
+        for i,j in pairs:
+            sequence -= nilsson_pair[state[i]][state[j]]
+        state[empty_lot] = piece
+        state[position] = 0
+        for i,j in pairs:
+            sequence += nilsson_pair[state[i]][state[j]]
+        state[position] = piece # Put the piece back since we're only peeking
+        state[empty_lot] = 0
+        if empty_lot == 0: # A tile would move into the center
+            sequence += 1
+        elif position == 0: # The tile in the center would move out
+            sequence -= 1
+        # The piece that moves is the only one whose Manhattan distance or solved status changes
+        return (
+            state_int,
+            self.hamming + (piece != empty_lot) - (piece != position),
+            self.manhattan + board.manhattan[piece][empty_lot] - board.manhattan[piece][position],
+            sequence
+        )
+
+    def snapshot(self) -> tuple:
+        """Returns the current (state_int, hamming, manhattan, sequence) in the same format as peek()"""
+        return (self.state_int,self.hamming,self.manhattan,self.sequence)
 
-    def shuffle(self,num_moves = 31):
+    def shuffle(self,num_moves = 31,rng = random):
         """Shuffles the puzzle by doing random valid moves (originally I just had it shuffle the list, but then I remembered that some configurations are unsolvable)
         
         Args:
             num_moves (int): number of random moves to do. By default, it is 31 because I read somewhere that it takes 31 moves to solve the 8-puzzle, but I could not find the original source that explicitly states this, so I'll figure it out later.
+            rng (random.Random): Random number generator to use. Defaults to the global one from the random module, but passing in a seeded random.Random makes the scrambles reproducible without touching the global seed.
         """
         move_count = 0
-        prev_position = random.choice(self.list_valid_moves())
+        prev_position = rng.choice(self.list_valid_moves())
 
         while move_count < num_moves:
             valid_moves = self.list_valid_moves()
             valid_moves.remove(prev_position) # Makes sure we don't undo the previous move because there is a very good chance of that happening
-            next_move = random.choice(valid_moves)
+            next_move = rng.choice(valid_moves)
             prev_position = self.get_empty_position()
             self.move(next_move)
             move_count += 1
 
-    def move_sequence(self,sequence):
-        """Performs a sequence of moves represented as a string of integers"""
-        logging.info(f"Initial position:\n{self}\nh(n): {self.get_unsolved_pieces()}\nInversions: {self.count_inversions()}\n")
+    def move_sequence(self,sequence,trace=True):
+        """Performs a sequence of moves represented as a string of integers (using the same characters as Puzzle.DIGITS)
+
+        Args:
+            sequence (str): The moves to make
+            trace (bool): Whether to write every position to the trace log (see trace_log.py). Nothing gets written unless the trace log was started anyway.
+        """
+        trace = trace and TRACE.isEnabledFor(logging.INFO)
+        if trace:
+            TRACE.info("Initial position: %s",PuzzleTrace(self.board,self.state_int))
         for move in sequence:
-            self.move(int(move))
-            logging.info(f"Position after moving {move}: {self.get_state_str()}\n{self}\nh(n): {self.get_unsolved_pieces()}\nInversions: {self.count_inversions()}")
-            logging.info(f"Manhattan Distance: {self.total_manhattan_distance()}\n")
+            self.move(int(move,36))
+            if trace:
+                # Only the packed state gets saved here. Turning it into text happens later on the trace log's own thread.
+                TRACE.info("Position after moving %s: %s",move,PuzzleTrace(self.board,self.state_int))
 
     def __str__(self):
-        indices = [1,2,3,8,0,4,7,6,5] # Since the puzzle positions are in a spiral, we need to print them in a different order to make them appear correctly
-        output = "="*7 + "\n"
+        indices = self.board.row_major_order # Since the puzzle positions are in a spiral, we need to print them in a different order to make them appear correctly
+        cols = self.board.cols
+        width = len(str(self.board.size-1)) # Make every square as wide as the biggest number
+        border = "="*((width+1)*cols+1)
+        output = border + "\n"
         for real_position,index in enumerate(indices): 
             # real_position is where on the physical puzzle to display the puzzle piece. Here we're just using it to keep track of where on the physical puzzle we're printing.
             square = self.state[index] # The number to display
-            if real_position in [3,6]: # Next line
+            if real_position != 0 and real_position%cols == 0: # Next line
                 output += "|\n"
-            output += f"|{square if square!=0 else ' '}"
-        return output + "|\n" +"="*7 # Gotta include that last border
+            output += f"|{square if square!=0 else ' ':>{width}}"
+        return output + "|\n" + border # Gotta include that last border
     
+class PuzzleTrace:
+    """
+    A position of the puzzle for the trace log that only gets turned into text if the log actually writes it out. It holds the packed state instead of the Puzzle itself since the puzzle will probably have moved on by the time that happens.
+
+    Attributes:
+        board (Board): Board the position is on
+        state_int (int): Packed state of the position
+    """
+
+    __slots__ = ("board","state_int")
+
+    def __init__(self,board,state_int):
+        self.board = board
+        self.state_int = state_int
+
+    def __str__(self):
+        board = self.board
+        puzzle = Puzzle(rows=board.rows,cols=board.cols,layout=board.layout,track_heuristics=False)
+        puzzle.set_state_int(self.state_int)
+        return f"{puzzle.get_state_str()}\n{puzzle}\nh(n): {puzzle.get_unsolved_pieces()}\nInversions: {puzzle.count_inversions()}\nManhattan Distance: {puzzle.total_manhattan_distance()}\n"
+
+def spiral_coords(rows,cols) -> list:
+    """Returns the matrix coordinates of each position for the spiral layout. The squares are numbered by following the spiral clockwise inwards from the top left corner, starting at 1, and the last square of the spiral gets position 0. On the 3x3 board this gives exactly Puzzle.COORDS.
+
+    Args:
+        rows (int): Number of rows on the board
+        cols (int): Number of columns on the board
+
+    Returns:
+        list[tuple]: (row, column) of each position
+    """
+    order = []
+    top,bottom,left,right = 0,rows-1,0,cols-1
+    while top <= bottom and left <= right:
+        for col in range(left,right+1):
+            order.append((top,col))
+        for row in range(top+1,bottom+1):
+            order.append((row,right))
+        if top < bottom:
+            for col in range(right-1,left-1,-1):
+                order.append((bottom,col))
+        if left < right:
+            for row in range(bottom-1,top,-1):
+                order.append((row,left))
+        top,bottom,left,right = top+1,bottom-1,left+1,right-1
+    return [order[-1]] + order[:-1]
+
+def row_major_coords(rows,cols) -> list:
+    """Returns the matrix coordinates of each position for the row-major layout, where the positions are just numbered left to right and top to bottom (so the empty space goes in the top left corner when it's solved)"""
+    return [(position//cols,position%cols) for position in range(rows*cols)]
+
+def count_inversions(state,board) -> int:
+    """Counts the number of inversions in a state list (see Puzzle.count_inversions())"""
+    # Due to the way I've implemented the puzzle, finding the row-major order of the pieces is a bit unnatural, but it should work fine
+    placements = board.row_major_order
+    row_major_order = []
+    count = 0
+
+    for position in placements:
+        if state[position] != 0: # Empty space isn't included
+            row_major_order.append(state[position])
+
+    # I could definitely have made this much neater with list comprehensions, but this makes it easier for me to compare to the example I looked at
+    for i in range(len(row_major_order)):
+        for j in range(i+1,len(row_major_order)):
+            first_square = row_major_order[i]
+            second_square = row_major_order[j]
+            if first_square > second_square:
+                count += 1
+
+    return count
+
+def rank_placement(positions,size) -> int:
+    """Ranks a placement of some tiles on the board, so every possible placement gets its own index from 0 to size!/(size-k)!-1 (a perfect hash). It works like a number where each digit is how many free squares come before the tile's square, and each digit has one less option than the last. The same thing works for ranking the pieces of a state, since those are just as different from each other as positions are.
+
+    Args:
+        positions (list[int]): Position of each tile in the pattern (they need to be different)
+        size (int): Number of squares on the board
+
+    Returns:
+        int: Rank of the placement
+    """
+    rank = 0
+    used = 0 # Bitmask of the squares taken by the tiles before this one
+    for i,position in enumerate(positions):
+        rank = rank*(size-i) + position - (used & ((1 << position) - 1)).bit_count()
+        used |= 1 << position
+    return rank
+
+def placement_count(size,k) -> int:
+    """Returns the number of ways to place k different tiles on a board with size squares (size!/(size-k)!)"""
+    count = 1
+    for i in range(k):
+        count *= size - i
+    return count
+
+class Board:
+    """
+    A class holding everything about the shape of the board: its size, how the positions are laid out, and the lookup tables the puzzle uses for move generation and heuristics. These get built once per board size so that the heuristics and move generation (which run for every node the solver creates) are just table lookups instead of redoing the same arithmetic over and over. Use get_board() instead of making these directly so each board size only gets built once.
+
+    Attributes:
+        rows (int): Number of rows
+        cols (int): Number of columns
+        layout (str): "spiral" (the default, see Puzzle) or "row" for row-major
+        size (int): Number of squares on the board
+        coords (list): (row, column) of each position
+        bits (int): Number of bits each position takes up in a packed state. It's 4 up to the 15-puzzle and only grows when the numbers stop fitting.
+        solved_state (list): The solved state, which is always [0,1,2,...]
+        solved_int (int): The solved state packed into an integer
+        tile_placements (int): (size-1)!/2, the number of solvable ways to arrange the tiles around one position of the empty space
+        row_major_order (list): Positions in the order they appear when reading the board left to right and top to bottom
+        solved_parity (int): Parity of the solved state that a state needs to match to be solvable (see Puzzle.is_solvable())
+        neighbors (tuple): neighbors[position] is the tuple of valid moves when the empty space is at that position
+        manhattan (tuple): manhattan[piece][position] is the Manhattan distance of the piece when it sits at that position. The empty space always counts as 0.
+        pairs (tuple): Pairs of positions that are next to each other in the Nilsson sequence (position i and the position after it, wrapping around at the end)
+        nilsson_pair (tuple): nilsson_pair[piece][next_piece] is what a pair of neighbouring pieces adds to the Nilsson sequence (before multiplying by 3): 2 if the piece isn't followed by its correct successor
+        move_pairs (tuple): move_pairs[empty][position] is every pair in pairs that includes either square, which are the only pairs whose score can change when the piece at position moves into the empty space
+        symmetries (tuple): Every rotation and reflection of the board that keeps position 0 in place (the identity is always first), as tuples where symmetry[position] is where that position ends up. Since each piece's solved position moves along with it, these map the solved state to itself, so a state and its reflection take the same number of moves to solve.
+    """
+
+    def __init__(self,rows=3,cols=3,layout="spiral"):
+        if rows < 2 or cols < 2: raise Exception("The board needs at least 2 rows and 2 columns")
+        if layout == "spiral":
+            self.coords = spiral_coords(rows,cols)
+        elif layout == "row":
+            self.coords = row_major_coords(rows,cols)
+        else:
+            raise Exception(f"Unknown layout {layout}. It needs to be either spiral or row")
+        self.rows = rows
+        self.cols = cols
+        self.layout = layout
+        self.size = rows*cols
+        self.bits = max(4,(self.size-1).bit_length())
+        self.mask = (1 << self.bits) - 1
+        self.solved_state = list(range(self.size))
+        self.solved_int = self.encode(self.solved_state)
+        self.tile_placements = placement_count(self.size-1,self.size-3) # Number of ways to rank the tiles once the empty space is placed (see rank())
+
+        # Work out the parity of the solved state the same way Puzzle.is_solvable() does
+        self.row_major_order = sorted(range(self.size),key=lambda position: self.coords[position])
+        parity = count_inversions(self.solved_state,self)
+        if cols%2 == 0:
+            parity += self.coords[0][0]
+        self.solved_parity = parity%2
+
+        position_of = {coord: position for position,coord in enumerate(self.coords)}
+        self.neighbors = tuple(self._neighbors(position,position_of) for position in range(self.size))
+        self.manhattan = tuple(
+            tuple(0 if piece == 0 else self.distance(piece,position) for position in range(self.size))
+            for piece in range(self.size)
+        )
+
+        last = self.size - 1
+        self.pairs = tuple((i,i%last+1) for i in range(1,self.size))
+        self.nilsson_pair = tuple(
+            tuple(2 if piece != 0 and next_piece != piece%last + 1 else 0 for next_piece in range(self.size))
+            for piece in range(self.size)
+        )
+        # Only moves that can actually happen get their pairs worked out, since the rest would never get looked up
+        move_pairs = [[() for position in range(self.size)] for empty in range(self.size)]
+        for empty in range(self.size):
+            for position in self.neighbors[empty]:
+                move_pairs[empty][position] = tuple(pair for pair in self.pairs if empty in pair or position in pair)
+        self.move_pairs = tuple(tuple(row) for row in move_pairs)
+        self.symmetries = self._symmetries(position_of)
+
+    def _neighbors(self,position,position_of) -> tuple:
+        """Returns the positions that can move into the empty space when it is at the given position"""
+        row,col = self.coords[position]
+        neighbors = [position_of[(r,c)] for r,c in ((row-1,col),(row+1,col),(row,col-1),(row,col+1)) if (r,c) in position_of]
+        if self.layout != "spiral":
+            return tuple(sorted(neighbors))
+
+        # For the spiral, this keeps the same order the 8-puzzle always used: squares on another ring of the spiral first (e.g. the center), then the previous square in the spiral, then the next one. The squares of a ring are numbered one after the other, so how far apart two squares are in the spiral (wrapping around the ring) tells us which is which.
+        def ring(p):
+            r,c = self.coords[p]
+            return min(r,c,self.rows-1-r,self.cols-1-c)
+        def spiral_index(p):
+            return p-1 if p > 0 else self.size-1
+        ring_size = sum(1 for p in range(self.size) if ring(p) == ring(position))
+        def order(p):
+            if ring(p) != ring(position):
+                return (0,p)
+            return (1,-((spiral_index(p)-spiral_index(position))%ring_size))
+        return tuple(sorted(neighbors,key=order))
+
+    def _symmetries(self,position_of) -> tuple:
+        """Returns the rotations and reflections of the board that keep position 0 where it is (see symmetries)"""
+        rows,cols = self.rows,self.cols
+        transforms = [
+            lambda r,c: (r,c),
+            lambda r,c: (rows-1-r,cols-1-c), # Rotate 180 degrees
+            lambda r,c: (rows-1-r,c), # Flip upside down
+            lambda r,c: (r,cols-1-c) # Flip left to right
+        ]
+        if rows == cols: # Only square boards can be rotated 90 degrees or flipped along a diagonal
+            transforms += [
+                lambda r,c: (c,r),
+                lambda r,c: (cols-1-c,rows-1-r),
+                lambda r,c: (c,rows-1-r),
+                lambda r,c: (cols-1-c,r)
+            ]
+        symmetries = []
+        for transform in transforms:
+            symmetry = tuple(position_of[transform(*self.coords[position])] for position in range(self.size))
+            if symmetry[0] == 0:
+                symmetries.append(symmetry)
+        return tuple(symmetries)
+
+    def distance(self,position_a,position_b) -> int:
+        """Returns the Manhattan distance between two positions on the board"""
+        a = self.coords[position_a]
+        b = self.coords[position_b]
+        return abs(a[0]-b[0]) + abs(a[1]-b[1])
+
+    def encode(self,state) -> int:
+        """Packs a list of pieces into a single integer using bits bits per position
+
+        Args:
+            state (list[int]): List of pieces like Puzzle.state
+
+        Returns:
+            int: Packed integer where position i is stored in bits i*bits to (i+1)*bits-1
+        """
+        state_int = 0
+        for position,piece in enumerate(state):
+            state_int |= piece << (self.bits*position)
+        return state_int
+
+    def decode(self,state_int) -> list:
+        """Unpacks an integer made by encode() back into a list of pieces"""
+        bits = self.bits
+        mask = self.mask
+        return [(state_int >> (bits*position)) & mask for position in range(self.size)]
+
+    def rank(self,state_int) -> int:
+        """Does the same thing as rank_state(), but straight from a packed state so no list has to be made. This gives every solvable state an index from 0 to size!/2-1."""
+        bits = self.bits
+        mask = self.mask
+        size = self.size
+        empty = 0
+        tile_rank = 0
+        used = 0 # Bitmask of the tiles ranked so far
+        radix = size - 1
+        for position in range(size):
+            piece = (state_int >> (bits*position)) & mask
+            if piece == 0:
+                empty = position
+            elif radix > 2: # The last two tiles don't get ranked
+                tile = piece - 1
+                tile_rank = tile_rank*radix + tile - (used & ((1 << tile) - 1)).bit_count()
+                used |= 1 << tile
+                radix -= 1
+        return empty*self.tile_placements + tile_rank
+
+BOARDS = {} # Boards that have already been built, keyed by (rows, cols, layout)
+
+def get_board(rows=3,cols=3,layout="spiral") -> Board:
+    """Returns the Board with the given size and layout, only building it the first time it's asked for"""
+    key = (rows,cols,layout)
+    if key not in BOARDS:
+        BOARDS[key] = Board(rows,cols,layout)
+    return BOARDS[key]
+
+DEFAULT_BOARD = get_board() # The 8-puzzle
+
+def rank_state(state) -> int:
+    """Ranks a state list so every solvable state of the board gets its own index from 0 to size!/2-1. Once the empty space's position is fixed, exactly half of the ways to arrange the tiles in the other squares are solvable, and swapping the last two tiles always switches between the solvable and unsolvable half. So we rank the empty space's position and then only the first size-3 tiles (read in position order), since the last two tiles are whichever ones are left over and only one of their orders is solvable."""
+    size = len(state)
+    empty = state.index(0)
+    tiles = [piece-1 for piece in state if piece != 0] # Numbered from 0 so they fit in the size-1 squares that aren't empty
+    return empty*placement_count(size-1,size-3) + rank_placement(tiles[:size-3],size-1)
+
+def hamming_distance(state) -> int:
+    """Returns the Hamming distance (number of misplaced pieces, not counting the empty space) of a state list"""
+    count = 0
+    for position,piece in enumerate(state):
+        if piece != position and piece != 0:
+            count += 1
+    return count
+
+def manhattan_distance(state,board=DEFAULT_BOARD) -> int:
+    """Returns the total Manhattan distance of a state list using the board's manhattan table"""
+    manhattan = board.manhattan
+    total = 0
+    for position,piece in enumerate(state):
+        total += manhattan[piece][position]
+    return total
+
+def nilsson_sequence(state,board=DEFAULT_BOARD) -> int:
+    """Returns the sequence part of the Nilsson's sequence score of a state list (before it gets multiplied by 3 and the Manhattan distance gets added)"""
+    nilsson_pair = board.nilsson_pair
+    score = 1 if state[0] != 0 else 0 # Tile in the center
+    for i,j in board.pairs:
+        score += nilsson_pair[state[i]][state[j]]
+    return score
+
+def nilsson_sequence_score(state,board=DEFAULT_BOARD) -> int:
+    """Returns the Nilsson's sequence score of a state list using the board's lookup tables. See Puzzle.nilsson_score() for how the score works."""
+    return 3*nilsson_sequence(state,board) + manhattan_distance(state,board)
+
 if __name__=="__main__":
+    start_trace_log()
     toy = Puzzle()
     print(toy)
     toy.set_state("412367580")
@@ -212,6 +613,8 @@ if __name__=="__main__":
     print(toy.count_inversions())
     toy.move_sequence("76540678065406540654065406540654065408760456780")
     print(toy)
+
+    # The heuristics that slide() keeps updated get checked against recalculating them from scratch in test_puzzle.py
     # toy.shuffle()
     # print(toy)
     # print(toy.count_inversions())
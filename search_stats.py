@@ -0,0 +1,147 @@
+from time import perf_counter_ns
+
+class SearchStats:
+    """
+    A class for collecting numbers about what the solver is doing while it searches. The solver only touches it when one is passed in (see Solver), so searches without one don't pay for any of this. It gets reset at the start of every solve, so after solve() returns it only describes that one search.
+    Callbacks can be added to find out about things while the search is still going. They get called as callback(event, stats) where event is one of:
+        "trace": Another trace_interval nodes were expanded, and a new entry was added to trace
+        "phase": A phase of the solve finished, and phase_ns has its time
+        "solve": The solve finished
+    Anything that needs to see every single node can subclass this and override expanded(), generated() or pruned() instead.
+
+    Attributes:
+        nodes_expanded (int): Nodes taken off the queue (or frontier) and expanded
+        nodes_generated (int): Child nodes created and queued
+        duplicates_pruned (int): Children thrown away because their position was already reached at the same depth or better
+        peak_open (int): Most nodes waiting in the queue (or frontier) at once
+        heuristic_ns (int): Time spent working out the cost of new nodes, in nanoseconds. The Manhattan distance and Nilsson's sequence get updated as part of each move (see Puzzle.peek()), so for those this is mostly just adding them up, but the pattern database lookups all land in here.
+        phase_ns (dict): Time spent in each phase of the solve ("setup", "cache", "search"), in nanoseconds
+        trace (list): (seconds since the solve started, nodes expanded so far, expansions per second since the last entry) every trace_interval expansions
+        trace_interval (int): Number of expansions between trace entries
+        callbacks (list): Functions that get called on each event
+    """
+
+    def __init__(self,trace_interval=10000,callbacks=None):
+        self.trace_interval = trace_interval
+        self.callbacks = list(callbacks) if callbacks else []
+        self.reset()
+
+    def reset(self):
+        """Clears every number to get ready for a new solve"""
+        self.nodes_expanded = 0
+        self.nodes_generated = 0
+        self.duplicates_pruned = 0
+        self.peak_open = 0
+        self.heuristic_ns = 0
+        self.phase_ns = {}
+        self.trace = []
+        self.start_ns = perf_counter_ns()
+        self.last_trace_ns = self.start_ns
+        self.next_trace = self.trace_interval
+
+    def add_callback(self,callback):
+        """Adds a function to call on each event (see above)"""
+        self.callbacks.append(callback)
+
+    def emit(self,event):
+        """Calls every callback with an event"""
+        for callback in self.callbacks:
+            callback(event,self)
+
+    def expanded(self,open_size):
+        """Counts an expanded node
+
+        Args:
+            open_size (int): Number of nodes still waiting in the queue (or frontier)
+        """
+        self.nodes_expanded += 1
+        if open_size > self.peak_open:
+            self.peak_open = open_size
+        if self.nodes_expanded >= self.next_trace:
+            self.next_trace += self.trace_interval
+            now = perf_counter_ns()
+            rate = self.trace_interval*1e9/max(now-self.last_trace_ns,1)
+            self.last_trace_ns = now
+            self.trace.append(((now-self.start_ns)/1e9,self.nodes_expanded,rate))
+            self.emit("trace")
+
+    def generated(self):
+        """Counts a new child node"""
+        self.nodes_generated += 1
+
+    def pruned(self):
+        """Counts a child that was thrown away since its position was already reached"""
+        self.duplicates_pruned += 1
+
+    def phase(self,name):
+        """Returns a context manager that adds the time spent inside it to phase_ns[name]"""
+        return Phase(self,name)
+
+    def finish(self):
+        """Tells the callbacks the solve is done"""
+        self.emit("solve")
+
+    def summary(self) -> dict:
+        """Returns every number as a flat dictionary, with times in milliseconds"""
+        summary = {
+            "nodes_expanded" : self.nodes_expanded,
+            "nodes_generated" : self.nodes_generated,
+            "duplicates_pruned" : self.duplicates_pruned,
+            "peak_open" : self.peak_open,
+            "heuristic_ms" : self.heuristic_ns/1e6
+        }
+        for name,ns in self.phase_ns.items():
+            summary[f"{name}_ms"] = ns/1e6
+        search_ns = self.phase_ns.get("search",0)
+        summary["expansions_per_second"] = self.nodes_expanded*1e9/search_ns if search_ns else 0.0
+        return summary
+
+class Phase:
+    """Context manager that times one phase of a solve for SearchStats.phase()"""
+
+    def __init__(self,stats,name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self,*exc_info):
+        phase_ns = self.stats.phase_ns
+        phase_ns[self.name] = phase_ns.get(self.name,0) + perf_counter_ns() - self.start
+        self.stats.emit("phase")
+        return False
+
+class NoStats:
+    """Stand-in for SearchStats.phase() when the solver isn't collecting stats, so the phases can always be written as with blocks"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc_info):
+        return False
+
+NO_STATS = NoStats()
+
+if __name__=="__main__":
+    # Solve one scramble with each algorithm and print what the stats saw
+    import random
+    from Solver import Solver
+    from puzzle import Puzzle
+    scrambler = Puzzle()
+    scrambler.shuffle(31,random.Random(2))
+    scramble = scrambler.get_state_str()
+    print(f"Solving {scramble}")
+
+    def print_trace(event,stats):
+        if event == "trace":
+            seconds,expanded,rate = stats.trace[-1]
+            print(f"  {expanded} nodes after {seconds:.2f}s ({rate:.0f} nodes/s)")
+
+    for alg in ["UCS","BFS","A","PDB","IDA","BIDI"]:
+        stats = SearchStats(trace_interval=20000,callbacks=[print_trace])
+        solver = Solver(alg,stats=stats)
+        solution = solver.solve(scramble)
+        summary = ", ".join(f"{name}={value:.2f}" if isinstance(value,float) else f"{name}={value}" for name,value in stats.summary().items())
+        print(f"{alg} ({len(solution)} moves): {summary}")
@@ -0,0 +1,178 @@
+import dbm
+from collections import OrderedDict
+from puzzle import *
+
+class SolveCache:
+    """
+    A class to remember the solutions the solver has already found, so solving the same scramble again (or a rotated/reflected copy of it) is just a lookup. Every state gets turned into a canonical form first: it's put through each of the board's symmetries (see Board.symmetries) and the one with the smallest packed integer is the one that gets stored. The 8-puzzle has 8 of them, so one solution covers up to 8 different scrambles. The moves are stored in the canonical orientation too, and they just get mapped back through the symmetry on the way out.
+    That only works for algorithms that always find the shortest solution though. The others (like A* with the Nilsson score, which depends on going clockwise) can find a longer or shorter solution for a reflected copy, so sharing their solutions would make what comes out of the cache depend on which copy got solved first. Those get symmetric=False, which stores them under their exact state instead.
+    Only the max_size most recently used solutions are kept in memory. If a path is given, every solution also gets written to a dbm file there, so they survive between runs and anything that got pushed out of memory can still be found.
+
+    Attributes:
+        max_size (int): Most solutions to keep in memory
+        entries (OrderedDict): (moves, bound) of the solutions in memory, keyed by (alg, board, canonical state), from least to most recently used
+        store (dbm): The on-disk store, or None if there isn't one
+        hits (int): Number of lookups that found a solution
+        misses (int): Number of lookups that didn't
+    """
+
+    def __init__(self,max_size=100000,path=None):
+        """Initializes a SolveCache object
+
+        Args:
+            max_size (int): Most solutions to keep in memory
+            path (str): Optional file to keep every solution in, which gets created if it doesn't exist yet
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.store = dbm.open(path,"c") if path else None
+        self.hits = 0
+        self.misses = 0
+        self.translations = {} # (board, symmetry) -> (forward, backward) tables for str.translate() that map move sequences through the symmetry
+
+    def canonicalize(self,board,state_int) -> tuple:
+        """Finds the canonical form of a state
+
+        Args:
+            board (Board): Board the state is on
+            state_int (int): Packed state
+
+        Returns:
+            tuple: (canonical state_int, index of the symmetry in board.symmetries that turns the state into it)
+        """
+        if len(board.symmetries) == 1:
+            return state_int,0
+        state = board.decode(state_int)
+        best = None
+        for i,symmetry in enumerate(board.symmetries):
+            # The piece at each position moves to symmetry[position], and it gets renumbered to symmetry[piece] since that's where its solved position ended up
+            moved = [0]*board.size
+            for position,piece in enumerate(state):
+                moved[symmetry[position]] = symmetry[piece]
+            moved_int = board.encode(moved)
+            if best is None or moved_int < best[0]:
+                best = (moved_int,i)
+        return best
+
+    def get_translations(self,board,i) -> tuple:
+        """Returns the (forward, backward) str.translate() tables that map a move sequence through symmetry i of the board and back"""
+        key = (board,i)
+        if key not in self.translations:
+            symmetry = board.symmetries[i]
+            forward = {ord(Puzzle.DIGITS[position]) : Puzzle.DIGITS[moved] for position,moved in enumerate(symmetry)}
+            backward = {ord(Puzzle.DIGITS[moved]) : Puzzle.DIGITS[position] for position,moved in enumerate(symmetry)}
+            self.translations[key] = (str.maketrans(forward),str.maketrans(backward))
+        return self.translations[key]
+
+    @staticmethod
+    def store_key(alg,board,canonical) -> str:
+        """Returns the key a solution is saved under in the on-disk store"""
+        return f"{alg} {board.rows}x{board.cols}-{board.layout} {canonical:x}"
+
+    def get(self,alg,board,state_int,symmetric=True):
+        """Looks up the solution of a state
+
+        Args:
+            alg (str): Algorithm the solution has to come from, since they don't all find the same solutions
+            board (Board): Board the state is on
+            state_int (int): Packed state
+            symmetric (bool): Whether solutions of rotated/reflected copies of the state count (see above)
+
+        Returns:
+            str: The move sequence that solves the state, or None if it hasn't been solved before
+        """
+        found = self.lookup(alg,board,state_int,symmetric)
+        return None if found is None else found[0]
+
+    def lookup(self,alg,board,state_int,symmetric=True):
+        """Like get(), but also returns the bound that was saved with the solution
+
+        Args:
+            alg (str): Algorithm the solution has to come from
+            board (Board): Board the state is on
+            state_int (int): Packed state
+            symmetric (bool): Whether solutions of rotated/reflected copies of the state count
+
+        Returns:
+            tuple: (moves, bound) where bound is how many times longer than the shortest solution the moves could be (None if it wasn't saved), or None if the state hasn't been solved before
+        """
+        canonical,i = self.canonicalize(board,state_int) if symmetric else (state_int,0)
+        key = (alg,board,canonical)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        elif self.store is not None:
+            stored = self.store.get(SolveCache.store_key(alg,board,canonical))
+            if stored is not None:
+                moves,_,bound = stored.decode("ascii").partition(" ") # Solutions with a bound are saved as "moves bound"
+                entry = (moves,float(bound) if bound else None)
+                self.remember(key,entry)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        moves,bound = entry
+        return moves.translate(self.get_translations(board,i)[1]),bound
+
+    def put(self,alg,board,state_int,moves,bound=None,symmetric=True):
+        """Saves the solution of a state
+
+        Args:
+            alg (str): Algorithm that found the solution
+            board (Board): Board the state is on
+            state_int (int): Packed state
+            moves (str): Move sequence that solves it
+            bound (float): Optional bound on how many times longer than the shortest solution the moves could be
+            symmetric (bool): Whether the solution can be shared with rotated/reflected copies of the state. It has to be the same as what the lookups use.
+        """
+        canonical,i = self.canonicalize(board,state_int) if symmetric else (state_int,0)
+        moves = moves.translate(self.get_translations(board,i)[0])
+        self.remember((alg,board,canonical),(moves,bound))
+        if self.store is not None:
+            self.store[SolveCache.store_key(alg,board,canonical)] = moves if bound is None else f"{moves} {bound!r}"
+
+    def remember(self,key,entry):
+        """Adds a (moves, bound) entry to the ones in memory, dropping the least recently used one if there are too many"""
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def close(self):
+        """Closes the on-disk store. Nothing can be saved after this."""
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def __len__(self):
+        return len(self.entries)
+
+if __name__=="__main__":
+    # Rough speed comparison: solve some scrambles, then every rotation/reflection of them, which should all come straight out of the cache (test_solve_cache.py checks that the solutions are right)
+    from time import time_ns
+    from Solver import Solver
+    cache = SolveCache(max_size=1000)
+    solver = Solver("IDA",cache=cache)
+    board = solver.puzzle.board
+    scrambler = Puzzle()
+    rng = random.Random(7)
+    scrambles = []
+    start = time_ns()
+    for i in range(50):
+        scrambler.shuffle(31,rng)
+        scrambles.append(scrambler.get_state_str())
+        solver.solve(scrambles[-1])
+    solve_time = (time_ns()-start)/1000000
+    cache.hits = cache.misses = 0
+    lookup_time = 0
+    for scramble in scrambles:
+        state = Puzzle(scramble).state
+        for symmetry in board.symmetries:
+            moved = [0]*board.size
+            for position,piece in enumerate(state):
+                moved[symmetry[position]] = symmetry[piece]
+            moved_str = "".join(Puzzle.DIGITS[piece] for piece in moved)
+            start = time_ns()
+            solver.solve(moved_str)
+            lookup_time += (time_ns()-start)/1000000
+    print(f"Solved {len(scrambles)} scrambles in {solve_time:.1f}ms, then all {cache.hits+cache.misses} symmetric copies in {lookup_time:.1f}ms ({cache.hits} hits, {cache.misses} misses)")
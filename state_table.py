@@ -0,0 +1,129 @@
+import os
+import tempfile
+from collections import deque
+from puzzle import *
+
+class StateTable:
+    """
+    A class holding the distance to the solved state and the best move for every solvable state of a board. The 8-puzzle only has 9!/2 = 181440 solvable states, so one breadth-first search from the solved state finds all of them, and after that solving any puzzle is just following the best moves, with no searching at all. The table takes 2 bytes per state (about 350KB for the 8-puzzle) and gets cached to disk so the search only ever happens once.
+    The number of states grows really fast with the board size (the 15-puzzle has over 10 trillion), so this only works for boards with up to 9 squares.
+
+    Attributes:
+        board (Board): Board the table was built for
+        distances (bytearray): distances[rank_state(state)] is the number of moves it takes to solve the state (255 if it can't be reached)
+        best_moves (bytearray): best_moves[rank_state(state)] is the move that gets the state one step closer to solved
+    """
+
+    MAX_SIZE = 9 # Biggest board (in squares) we allow building a table for
+
+    def __init__(self,board,distances,best_moves):
+        self.board = board
+        self.distances = distances
+        self.best_moves = best_moves
+
+    @staticmethod
+    def build(board):
+        """Builds the table with a breadth-first search from the solved state
+
+        Args:
+            board (Board): Board to build it for
+
+        Returns:
+            StateTable: The new table
+        """
+        if board.size > StateTable.MAX_SIZE:
+            raise Exception(f"A {board.rows}x{board.cols} board has too many states to put in a table")
+        count = placement_count(board.size,board.size-2)
+        distances = bytearray(b"\xff")*count
+        best_moves = bytearray(b"\xff")*count
+        puzzle = Puzzle(rows=board.rows,cols=board.cols,layout=board.layout,track_heuristics=False)
+        distances[rank_state(puzzle.state)] = 0
+        queue = deque([puzzle.get_state_int()])
+        while queue:
+            puzzle.set_state_int(queue.popleft())
+            distance = distances[rank_state(puzzle.state)] + 1
+            empty = puzzle.get_empty_position()
+            for move in puzzle.list_valid_moves():
+                puzzle.slide(move)
+                rank = rank_state(puzzle.state)
+                if distances[rank] == 255: # First time we've reached this state, so this is the shortest way here
+                    distances[rank] = distance
+                    best_moves[rank] = empty # Moving the piece back to where the empty space was undoes the move, which goes back towards the solved state
+                    queue.append(puzzle.get_state_int())
+                puzzle.slide(empty)
+        return StateTable(board,distances,best_moves)
+
+    @staticmethod
+    def file_name(board) -> str:
+        """Returns the default file name for the table of a board"""
+        return f"{board.rows}x{board.cols}-{board.layout}.table"
+
+    def save(self,path):
+        """Saves the table to a file. The file is just the distances followed by the best moves. It gets written to a temporary file in the same directory first and then renamed, so anything loading the table at the same time never sees half of it."""
+        handle,temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),suffix=".tmp")
+        try:
+            with os.fdopen(handle,"wb") as file:
+                file.write(self.distances)
+                file.write(self.best_moves)
+            os.replace(temporary,path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+    @staticmethod
+    def load(board,path):
+        """Loads a table saved by save()
+
+        Args:
+            board (Board): Board the table was built for
+            path (str): File the table was saved to
+        """
+        count = placement_count(board.size,board.size-2)
+        with open(path,"rb") as file:
+            data = file.read()
+        if len(data) != 2*count:
+            raise Exception(f"{path} is not a table for a {board.rows}x{board.cols} board")
+        return StateTable(board,bytearray(data[:count]),bytearray(data[count:]))
+
+    @staticmethod
+    def load_or_build(board,path=None):
+        """Loads the table for a board from disk, or builds it and saves it there if it hasn't been built yet
+
+        Args:
+            board (Board): Board to get the table for
+            path (str): File the table is cached in. Defaults to file_name(board) in the current directory.
+        """
+        if path is None:
+            path = StateTable.file_name(board)
+        if os.path.exists(path):
+            return StateTable.load(board,path)
+        table = StateTable.build(board)
+        table.save(path)
+        return table
+
+    def depth_counts(self) -> list:
+        """Returns how many states there are at each distance from the solved state, so depth_counts()[d] is the number of states that take d moves to solve. The list ends at the deepest state of the board."""
+        counts = [self.distances.count(distance) for distance in range(255)]
+        while counts and counts[-1] == 0:
+            counts.pop()
+        return counts
+
+    def distance(self,state) -> int:
+        """Returns the number of moves it takes to solve a state list"""
+        return self.distances[rank_state(state)]
+
+    def solve(self,puzzle) -> str:
+        """Solves a puzzle by following the best moves. The puzzle ends up solved.
+
+        Args:
+            puzzle (Puzzle): Puzzle to solve. It needs to be solvable and on the same board as the table.
+
+        Returns:
+            str: The shortest move sequence that solves the puzzle
+        """
+        moves = []
+        while not(puzzle.is_solved()):
+            move = self.best_moves[rank_state(puzzle.state)]
+            puzzle.slide(move)
+            moves.append(Puzzle.DIGITS[move])
+        return "".join(moves)
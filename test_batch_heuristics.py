@@ -0,0 +1,59 @@
+import random
+import pytest
+from puzzle import *
+
+np = pytest.importorskip("numpy")
+from batch_heuristics import *
+
+BOARDS = [
+    (3,3,"spiral"),
+    (4,4,"spiral"),
+    (3,4,"row"), # Not square, with an even width
+    (2,3,"spiral")
+]
+
+def random_states(board,count,seed):
+    """Returns count random state lists for the board, including unsolvable ones"""
+    rng = random.Random(seed)
+    return [rng.sample(range(board.size),board.size) for i in range(count)]
+
+@pytest.mark.parametrize("rows,cols,layout",BOARDS)
+def test_batch_features_match_scalar(rows,cols,layout):
+    board = get_board(rows,cols,layout)
+    state_lists = random_states(board,2000,5)
+    states = np.array(state_lists,dtype=np.uint8)
+    features = batch_features(states,board)
+    puzzle = Puzzle(rows=rows,cols=cols,layout=layout,track_heuristics=False)
+    for i,state in enumerate(state_lists):
+        puzzle.state = state
+        puzzle.empty = state.index(0)
+        assert features["Hamming"][i] == hamming_distance(state)
+        assert features["Manhattan"][i] == manhattan_distance(state,board)
+        assert features["Nilsson"][i] == nilsson_sequence_score(state,board)
+        assert features["Inversions"][i] == count_inversions(state,board)
+        assert features["Solvable"][i] == puzzle.is_solvable()
+
+@pytest.mark.parametrize("rows,cols,layout",BOARDS)
+def test_single_heuristics_match_features(rows,cols,layout):
+    board = get_board(rows,cols,layout)
+    states = np.array(random_states(board,500,6),dtype=np.uint8)
+    features = batch_features(states,board)
+    assert (batch_hamming_distance(states,board) == features["Hamming"]).all()
+    assert (batch_manhattan_distance(states,board) == features["Manhattan"]).all()
+    assert (batch_nilsson_sequence_score(states,board) == features["Nilsson"]).all()
+    assert (batch_count_inversions(states,board) == features["Inversions"]).all()
+    assert (batch_is_solvable(states,board) == features["Solvable"]).all()
+
+@pytest.mark.parametrize("rows,cols,layout",BOARDS)
+def test_states_from_strings_and_ints(rows,cols,layout):
+    board = get_board(rows,cols,layout)
+    state_lists = random_states(board,500,7)
+    states = np.array(state_lists,dtype=np.uint8)
+    strings = ["".join(Puzzle.DIGITS[piece] for piece in state) for state in state_lists]
+    assert (states_from_strings(strings,board) == states).all()
+    assert (states_from_strings([string.lower() for string in strings],board) == states).all()
+    assert (states_from_ints([board.encode(state) for state in state_lists],board) == states).all()
+
+def test_states_from_ints_needs_64_bits():
+    with pytest.raises(Exception):
+        states_from_ints([0],get_board(5,5))
@@ -0,0 +1,116 @@
+import csv
+import json
+import pytest
+from pipeline import *
+
+ALGS = ["A","BFS"]
+
+@pytest.fixture(scope="module",autouse=True)
+def working_directory(tmp_path_factory):
+    """Runs every test in a temporary directory, since the depth scrambles save the state table in the current one. It's shared so the table only gets built once."""
+    previous = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("tables"))
+    yield
+    os.chdir(previous)
+
+def read_rows(path):
+    """Reads the rows of a CSV written by a ResultSink, leaving out the times since they'll never match between runs"""
+    with open(path,newline="") as file:
+        return [{column : value for column,value in row.items() if not(column.startswith("Time"))} for row in csv.DictReader(file)]
+
+def test_resumed_run_matches_uninterrupted_run(tmp_path):
+    whole = str(tmp_path/"whole.csv")
+    resumed = str(tmp_path/"resumed.csv")
+    whole_sink = run_pipeline(whole,25,ALGS,seed=3,chunk_size=10)
+
+    sink = ResultSink(resumed,result_columns(ALGS),chunk_size=10)
+    for row in solve_results(scramble_source(3,25),ALGS):
+        sink.add(row)
+        if row["Index"] == 16: # "Crash" with 10 rows checkpointed and 7 more still in the buffer
+            break
+    with open(resumed,"a") as file:
+        file.write("half a row that never got checkpointed")
+    sink = run_pipeline(resumed,25,ALGS,seed=3,chunk_size=10,resume=True)
+
+    whole_rows = read_rows(whole)
+    assert len(whole_rows) == 25
+    assert read_rows(resumed) == whole_rows
+    assert sink.rows_written == whole_sink.rows_written == 25
+    for column in ["Nodes A","Moves A","Nodes BFS","Moves BFS"]:
+        assert sink.stats[column].to_dict() == whole_sink.stats[column].to_dict()
+
+def test_checkpoint_is_saved_after_each_chunk(tmp_path):
+    path = str(tmp_path/"results.csv")
+    sink = ResultSink(path,result_columns(ALGS),chunk_size=4)
+    for row in solve_results(scramble_source(3,6),ALGS):
+        sink.add(row)
+    with open(sink.checkpoint_path) as file:
+        assert json.load(file)["rows_written"] == 4
+    sink.close()
+    with open(sink.checkpoint_path) as file:
+        assert json.load(file)["rows_written"] == 6
+
+def test_resume_needs_the_same_columns(tmp_path):
+    path = str(tmp_path/"results.csv")
+    run_pipeline(path,3,ALGS,seed=3,chunk_size=2)
+    with pytest.raises(Exception):
+        ResultSink(path,result_columns(["A"]),resume=True)
+
+def test_running_stats_match_direct_calculation():
+    values = [3,1,4,1,5,9,2,6,5,3,5]
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+    mean = sum(values)/len(values)
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(mean)
+    assert stats.std() == pytest.approx(math.sqrt(sum((value-mean)**2 for value in values)/(len(values)-1)))
+    assert (stats.min,stats.max) == (1,9)
+    # Splitting it up through a checkpoint shouldn't change anything
+    first = RunningStats()
+    for value in values[:5]:
+        first.add(value)
+    second = RunningStats(**first.to_dict())
+    for value in values[5:]:
+        second.add(value)
+    assert second.to_dict() == stats.to_dict()
+
+def test_scramble_source_start():
+    scrambles = [scramble for index,scramble,depth in scramble_source(3,2500,chunk_size=1000)]
+    assert [scramble for index,scramble,depth in scramble_source(3,2500,start=1500,chunk_size=1000)] == scrambles[1500:]
+
+def test_depth_stratified_scrambles():
+    pytest.importorskip("numpy") # The PDB solver needs it
+    depth_rows = list(solve_results(scramble_source(3,6,depths=[10,20]),["PDB"]))
+    assert [row["Moves PDB"] for row in depth_rows] == [10,20,10,20,10,20]
+    assert [row["Scramble"] for row in solve_results(scramble_source(3,6,start=3,depths=[10,20]),["PDB"])] == [row["Scramble"] for row in depth_rows[3:]]
+
+def test_depth_source_resumes_from_its_state(tmp_path):
+    whole = str(tmp_path/"whole.csv")
+    resumed = str(tmp_path/"resumed.csv")
+    run_pipeline(whole,12,["A"],seed=3,depths=[8,14],chunk_size=5)
+
+    source = DepthSource(3,[8,14])
+    sink = ResultSink(resumed,result_columns(["A"]),chunk_size=5,source=source)
+    for row in solve_results(scramble_source(3,12,depths=[8,14],source=source),["A"]):
+        sink.add(row)
+        if row["Index"] == 7: # "Crash" with 5 rows checkpointed
+            break
+    source = DepthSource(3,[8,14])
+    ResultSink(resumed,result_columns(["A"]),chunk_size=5,resume=True,source=source)
+    assert source.index == 5 # Picked up from the checkpoint without generating the first 5 again
+    run_pipeline(resumed,12,["A"],seed=3,depths=[8,14],chunk_size=5,resume=True)
+    rows = read_rows(resumed)
+    assert rows == read_rows(whole)
+    assert [int(row["Moves A"]) >= int(row["Depth"]) for row in rows] == [True]*12
+    assert [int(row["Depth"]) for row in rows] == [8,14]*6
+
+def test_depth_source_keeps_going_once_a_depth_runs_out():
+    source = DepthSource(1,[8],buffer_size=10)
+    scrambles = [source.next()[1] for i in range(300)] # There are only 136 states 8 moves from solved
+    assert len(set(scrambles)) <= 136
+    assert all(len(found) <= 10 for found in source.found.values())
+
+def test_depths_past_the_deepest_state_are_rejected():
+    with pytest.raises(Exception):
+        next(scramble_source(1,1,depths=[32]))
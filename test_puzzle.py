@@ -0,0 +1,96 @@
+import random
+import pytest
+from puzzle import *
+
+BOARDS = [
+    (3,3,"spiral"), # The 8-puzzle
+    (4,4,"spiral"), # The 15-puzzle
+    (4,4,"row"),
+    (3,4,"row"), # Not square
+    (2,5,"spiral") # Only 2 rows
+]
+
+def assert_heuristics_match(puzzle):
+    """Checks that the heuristics and packed state the puzzle kept updated match recalculating them from scratch"""
+    state = puzzle.state
+    board = puzzle.board
+    assert puzzle.state_int == board.encode(state)
+    assert puzzle.hamming == hamming_distance(state)
+    assert puzzle.manhattan == manhattan_distance(state,board)
+    assert puzzle.sequence == nilsson_sequence(state,board)
+    assert puzzle.nilsson_score() == nilsson_sequence_score(state,board)
+    assert puzzle.empty == state.index(0)
+
+@pytest.mark.parametrize("rows,cols,layout",BOARDS)
+def test_slide_matches_recalculation(rows,cols,layout):
+    puzzle = Puzzle(rows=rows,cols=cols,layout=layout)
+    rng = random.Random(0)
+    for i in range(2000):
+        puzzle.slide(rng.choice(puzzle.list_valid_moves()))
+        assert_heuristics_match(puzzle)
+
+@pytest.mark.parametrize("rows,cols,layout",BOARDS)
+def test_peek_matches_slide(rows,cols,layout):
+    puzzle = Puzzle(rows=rows,cols=cols,layout=layout)
+    rng = random.Random(1)
+    for i in range(500):
+        before = puzzle.snapshot()
+        state = puzzle.state.copy()
+        for move in puzzle.list_valid_moves():
+            peeked = puzzle.peek(move)
+            assert puzzle.snapshot() == before and puzzle.state == state # Peeking can't move anything
+            puzzle.slide(move)
+            assert puzzle.snapshot() == peeked
+            assert_heuristics_match(puzzle)
+            puzzle.slide(state.index(0)) # Move it back
+        puzzle.slide(rng.choice(puzzle.list_valid_moves()))
+
+@pytest.mark.parametrize("rows,cols,layout",BOARDS)
+def test_set_state_int_matches_recalculation(rows,cols,layout):
+    scrambler = Puzzle(rows=rows,cols=cols,layout=layout)
+    puzzle = Puzzle(rows=rows,cols=cols,layout=layout)
+    rng = random.Random(2)
+    for i in range(50):
+        scrambler.shuffle(40,rng)
+        puzzle.set_state_int(scrambler.get_state_int())
+        assert puzzle.state == scrambler.state
+        assert_heuristics_match(puzzle)
+        # Sliding on from a state that was set directly should still keep everything in sync
+        for j in range(20):
+            puzzle.slide(rng.choice(puzzle.list_valid_moves()))
+            assert_heuristics_match(puzzle)
+
+def test_untracked_heuristics_are_recalculated():
+    puzzle = Puzzle(rows=4,cols=4,track_heuristics=False)
+    rng = random.Random(3)
+    for i in range(200):
+        puzzle.slide(rng.choice(puzzle.list_valid_moves()))
+        assert puzzle.state_int == puzzle.board.encode(puzzle.state)
+    assert puzzle.get_unsolved_pieces() == hamming_distance(puzzle.state)
+    assert puzzle.total_manhattan_distance() == manhattan_distance(puzzle.state,puzzle.board)
+    assert puzzle.nilsson_score() == nilsson_sequence_score(puzzle.state,puzzle.board)
+
+def reachable_states(rows,cols,layout):
+    """Returns every state that can be reached from the solved state, as packed integers"""
+    puzzle = Puzzle(rows=rows,cols=cols,layout=layout,track_heuristics=False)
+    seen = {puzzle.get_state_int()}
+    frontier = [puzzle.get_state_int()]
+    while frontier:
+        puzzle.set_state_int(frontier.pop())
+        for move in puzzle.list_valid_moves():
+            child = puzzle.peek(move)[0]
+            if child not in seen:
+                seen.add(child)
+                frontier.append(child)
+    return seen
+
+@pytest.mark.parametrize("rows,cols,layout",[(2,3,"spiral"),(2,4,"row"),(3,3,"spiral")])
+def test_rank_is_a_perfect_hash(rows,cols,layout):
+    board = get_board(rows,cols,layout)
+    states = reachable_states(rows,cols,layout)
+    count = placement_count(board.size,board.size-2) # size!/2
+    assert len(states) == count
+    ranks = {board.rank(state_int) for state_int in states}
+    assert ranks == set(range(count))
+    for state_int in list(states)[:2000]:
+        assert board.rank(state_int) == rank_state(board.decode(state_int))
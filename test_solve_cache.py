@@ -0,0 +1,112 @@
+import random
+import pytest
+from puzzle import *
+from Solver import Solver
+from solve_cache import SolveCache
+
+def symmetric_copies(state,board):
+    """Returns every rotation/reflection of a state list as state strings"""
+    copies = []
+    for symmetry in board.symmetries:
+        moved = [0]*board.size
+        for position,piece in enumerate(state):
+            moved[symmetry[position]] = symmetry[piece]
+        copies.append("".join(Puzzle.DIGITS[piece] for piece in moved))
+    return copies
+
+def scrambles(count,seed,rows=3,cols=None):
+    scrambler = Puzzle(rows=rows,cols=cols)
+    rng = random.Random(seed)
+    found = []
+    for i in range(count):
+        scrambler.shuffle(31,rng)
+        found.append(scrambler.get_state_str())
+    return found
+
+@pytest.mark.parametrize("rows,cols",[(3,3),(4,4),(2,3)])
+def test_canonicalize_is_the_same_for_every_symmetry(rows,cols):
+    cache = SolveCache()
+    board = get_board(rows,cols)
+    for scramble in scrambles(20,1,rows,cols):
+        state = Puzzle(scramble,rows=rows,cols=cols).state
+        canonical = {cache.canonicalize(board,board.encode([int(x,36) for x in copy]))[0] for copy in symmetric_copies(state,board)}
+        assert len(canonical) == 1
+
+@pytest.mark.parametrize("rows,cols",[(3,3),(2,3)])
+def test_solutions_round_trip_through_symmetries(rows,cols):
+    cache = SolveCache()
+    solver = Solver("IDA",rows=rows,cols=cols,cache=cache,trace=False)
+    board = solver.puzzle.board
+    for scramble in scrambles(10,2,rows,cols):
+        length = len(solver.solve(scramble))
+        for copy in symmetric_copies(Puzzle(scramble,rows=rows,cols=cols).state,board):
+            hits = cache.hits
+            moves = solver.solve(copy)
+            assert cache.hits == hits + 1 # Every copy comes straight out of the cache
+            assert len(moves) == length
+            puzzle = Puzzle(copy,rows=rows,cols=cols)
+            puzzle.move_sequence(moves,trace=False)
+            assert puzzle.is_solved()
+
+def test_inexact_solutions_are_not_shared_between_symmetries():
+    cache = SolveCache()
+    solver = Solver("A",cache=cache,trace=False)
+    fresh = Solver("A",trace=False)
+    for scramble in scrambles(10,6):
+        solver.solve(scramble)
+        for copy in symmetric_copies(Puzzle(scramble).state,DEFAULT_BOARD)[1:]:
+            assert solver.solve(copy) == fresh.solve(copy) # Always the same as solving it without the cache
+        assert solver.solve(scramble) == fresh.solve(scramble)
+    assert cache.hits > 0 # Solving the exact same scramble again still comes out of the cache
+
+def test_lru_eviction():
+    cache = SolveCache(max_size=2)
+    board = DEFAULT_BOARD
+    states = [Puzzle(scramble).get_state_int() for scramble in scrambles(3,3)]
+    cache.put("A",board,states[0],"1")
+    cache.put("A",board,states[1],"2")
+    assert cache.get("A",board,states[0]) is not None # Now states[1] is the least recently used
+    cache.put("A",board,states[2],"3")
+    assert len(cache) == 2
+    assert cache.get("A",board,states[1]) is None
+    assert cache.get("A",board,states[0]) is not None
+    assert cache.get("A",board,states[2]) is not None
+    assert cache.get("BFS",board,states[0]) is None # Other algorithms don't share solutions
+
+def test_bound_is_kept_with_the_solution(tmp_path):
+    path = str(tmp_path/"solutions")
+    cache = SolveCache(path=path)
+    state = Puzzle(scrambles(1,4)[0]).get_state_int()
+    cache.put("WA/2.0",DEFAULT_BOARD,state,"12",1.5)
+    assert cache.lookup("WA/2.0",DEFAULT_BOARD,state)[1] == 1.5
+    cache.close()
+    cache = SolveCache(path=path)
+    assert cache.lookup("WA/2.0",DEFAULT_BOARD,state)[1] == 1.5
+    cache.close()
+
+def test_weighted_solutions_are_kept_separate_by_weight():
+    cache = SolveCache()
+    puzzle = Puzzle()
+    puzzle.shuffle(60,random.Random(0))
+    scramble = puzzle.get_state_str()
+    weighted = Solver("WA",weight=5.0,cache=cache,trace=False)
+    optimal = Solver("WA",weight=1.0,cache=cache,trace=False)
+    optimal_length = len(Solver("IDA",trace=False).solve(scramble))
+    weighted.solve(scramble)
+    assert len(optimal.solve(scramble)) == optimal_length
+    bound = weighted.bound
+    weighted.solve(scramble) # This one comes out of the cache
+    assert cache.hits == 1 and weighted.bound == bound
+
+def test_dbm_persistence(tmp_path):
+    path = str(tmp_path/"solutions")
+    cache = SolveCache(max_size=1000,path=path)
+    solver = Solver("IDA",cache=cache,trace=False)
+    solutions = {scramble : solver.solve(scramble) for scramble in scrambles(20,5)}
+    cache.close()
+    # A fresh cache with no room in memory should still find everything in the on-disk store
+    cache = SolveCache(max_size=1,path=path)
+    for scramble,moves in solutions.items():
+        assert cache.get("IDA",DEFAULT_BOARD,Puzzle(scramble).get_state_int()) == moves
+    assert cache.hits == len(solutions) and len(cache) == 1
+    cache.close()
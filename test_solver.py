@@ -0,0 +1,172 @@
+import random
+import pytest
+from puzzle import *
+from Solver import *
+
+def scrambles(count,seed,num_moves=60,rows=3,cols=None,layout="spiral"):
+    scrambler = Puzzle(rows=rows,cols=cols,layout=layout)
+    rng = random.Random(seed)
+    found = []
+    for i in range(count):
+        scrambler.shuffle(num_moves,rng)
+        found.append(scrambler.get_state_str())
+    return found
+
+def assert_solves(scramble,moves,rows=3,cols=None,layout="spiral"):
+    puzzle = Puzzle(scramble,rows=rows,cols=cols,layout=layout)
+    puzzle.move_sequence(moves,trace=False)
+    assert puzzle.is_solved()
+
+def optimal_length(table,scramble) -> int:
+    return table.distance(Puzzle(scramble).state)
+
+def within_bound(length,bound,optimal) -> bool:
+    """The bound can be exactly length/optimal, so leave a little room for it getting rounded down"""
+    return length <= bound*optimal + 1e-9
+
+@pytest.mark.parametrize("weight",[1.0,1.5,2.0,5.0])
+def test_weighted_a_star_is_within_its_bound(table,weight):
+    solver = Solver("WA",weight=weight,trace=False)
+    for scramble in scrambles(30,1):
+        moves = solver.solve(scramble)
+        assert_solves(scramble,moves)
+        assert solver.bound == weight
+        assert within_bound(len(moves),solver.bound,optimal_length(table,scramble))
+
+@pytest.mark.parametrize("weight",[2.0,5.0])
+def test_unlimited_ara_finds_the_shortest_solution(table,weight):
+    solver = Solver("ARA",weight=weight,weight_step=0.5,trace=False)
+    for scramble in scrambles(30,2):
+        moves = solver.solve(scramble)
+        assert_solves(scramble,moves)
+        assert solver.bound == 1
+        assert len(moves) == optimal_length(table,scramble)
+        # Every solution on the way there has to be within the bound it was reported with, and they can only get better
+        for i,(seconds,length,bound) in enumerate(solver.improvements):
+            assert within_bound(length,bound,optimal_length(table,scramble))
+            if i:
+                assert length <= solver.improvements[i-1][1]
+
+@pytest.mark.parametrize("limits",[{"node_limit" : 0},{"node_limit" : 50},{"node_limit" : 500},{"time_limit" : 0},{"time_limit" : 0.001}])
+def test_limited_ara_is_within_its_bound(table,limits):
+    solver = Solver("ARA",weight=5.0,weight_step=1.0,trace=False,**limits)
+    for scramble in scrambles(30,3):
+        moves = solver.solve(scramble)
+        assert_solves(scramble,moves)
+        assert 1 <= solver.bound <= 5
+        assert within_bound(len(moves),solver.bound,optimal_length(table,scramble))
+
+def test_weight_below_one_is_rejected():
+    with pytest.raises(Exception):
+        Solver("WA",weight=0.5)
+
+def test_bidirectional_finds_the_shortest_solution(table):
+    solver = Solver("BIDI",trace=False)
+    for scramble in scrambles(100,4):
+        moves = solver.solve(scramble)
+        assert_solves(scramble,moves)
+        assert len(moves) == optimal_length(table,scramble)
+
+@pytest.mark.parametrize("rows,cols,layout",[(2,3,"spiral"),(2,4,"row"),(3,3,"row")])
+def test_bidirectional_matches_ida_on_other_boards(rows,cols,layout):
+    bidi = Solver("BIDI",rows=rows,cols=cols,layout=layout,trace=False)
+    ida = Solver("IDA",rows=rows,cols=cols,layout=layout,trace=False)
+    for scramble in scrambles(20,5,rows=rows,cols=cols,layout=layout):
+        moves = bidi.solve(scramble)
+        assert_solves(scramble,moves,rows,cols,layout)
+        assert len(moves) == len(ida.solve(scramble))
+
+def test_bidirectional_on_solved_and_one_move_scrambles():
+    solver = Solver("BIDI",trace=False)
+    assert solver.solve("012345678") == ""
+    puzzle = Puzzle()
+    for move in puzzle.list_valid_moves():
+        puzzle.slide(move)
+        assert len(solver.solve(puzzle.get_state_str())) == 1
+        puzzle.slide(0)
+
+@pytest.mark.parametrize("alg",["UCS","BFS","A","WA","ARA"])
+def test_compact_closed_set_gives_the_same_solutions(alg):
+    compact = Solver(alg,compact_closed=True,trace=False)
+    plain = Solver(alg,trace=False)
+    assert isinstance(compact.past_positions,ClosedSet) and isinstance(plain.past_positions,dict)
+    if alg == "UCS": # UCS gets slow fast, so it only gets short scrambles
+        tests = []
+        rng = random.Random(6)
+        for i in range(10):
+            scrambler = Puzzle()
+            scrambler.shuffle(14,rng)
+            tests.append(scrambler.get_state_str())
+    else:
+        tests = scrambles(30,6)
+    for scramble in tests:
+        assert len(compact.solve(scramble)) == len(plain.solve(scramble))
+
+@pytest.mark.parametrize("track_depth",[True,False])
+def test_closed_set_matches_a_dict(track_depth):
+    board = get_board(2,3)
+    closed = ClosedSet(board,track_depth)
+    expected = {}
+    puzzle = Puzzle(rows=2,cols=3,track_heuristics=False)
+    rng = random.Random(7)
+    for i in range(2000):
+        puzzle.slide(rng.choice(puzzle.list_valid_moves()))
+        state_int = puzzle.get_state_int()
+        assert (state_int in closed) == (state_int in expected)
+        assert closed.get(state_int) == (None if state_int not in expected else (expected[state_int] if track_depth else 0))
+        depth = rng.randrange(100)
+        if state_int not in expected or depth < expected[state_int]:
+            closed[state_int] = depth
+            expected[state_int] = depth
+
+def test_closed_set_rejects_big_boards():
+    with pytest.raises(Exception):
+        ClosedSet(get_board(4,4))
+    assert isinstance(Solver("UCS",rows=4,cols=4,compact_closed=True).past_positions,dict) # Falls back to a dictionary
+
+def test_open_list_breaks_ties_first_in_first_out():
+    queue = OpenList()
+    for key,cost in enumerate([3,1,2,1,3,1]):
+        queue.put(key,cost,key)
+    assert [queue.get() for i in range(6)] == [(1,1),(1,3),(1,5),(2,2),(3,0),(3,4)]
+    assert queue.empty()
+
+def test_open_list_decrease_key():
+    queue = OpenList()
+    queue.put("a",5,1)
+    queue.put("b",3,2)
+    queue.put("a",2,3) # Replaces the first "a"
+    assert queue.qsize() == 2
+    assert queue.peek() == (2,3)
+    assert queue.get() == (2,3)
+    assert queue.get() == (3,2)
+    assert queue.empty() and queue.qsize() == 0 # The replaced entry never comes out
+    with pytest.raises(Exception):
+        queue.get()
+    with pytest.raises(Exception):
+        queue.peek()
+
+def test_open_list_matches_sorting():
+    queue = OpenList()
+    rng = random.Random(11)
+    live = {}
+    order = 0
+    for i in range(2000):
+        key = rng.randrange(300)
+        cost = rng.randrange(50)
+        queue.put(key,cost,i)
+        live[key] = (cost,order,i)
+        order += 1
+    expected = [(cost,item) for cost,_,item in sorted(live.values())]
+    assert queue.qsize() == len(live)
+    assert [queue.get() for i in range(len(live))] == expected
+
+def test_ucs_finds_the_shortest_solution(table):
+    # This only works if positions reached again by a shorter path get re-queued with the lower cost
+    solver = Solver("UCS",trace=False)
+    rng = random.Random(12)
+    for i in range(10):
+        scrambler = Puzzle()
+        scrambler.shuffle(14,rng)
+        scramble = scrambler.get_state_str()
+        assert len(solver.solve(scramble)) == optimal_length(table,scramble)
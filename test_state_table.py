@@ -0,0 +1,96 @@
+import os
+import random
+import pytest
+from puzzle import *
+from Solver import Solver
+from state_table import StateTable
+
+def test_every_state_is_one_move_from_a_closer_state():
+    # Small enough to check every state: the distances have to go down by exactly one along the best move, and no move can get closer than that
+    board = get_board(2,3)
+    table = StateTable.build(board)
+    puzzle = Puzzle(rows=2,cols=3,track_heuristics=False)
+    count = placement_count(board.size,board.size-2)
+    assert 255 not in table.distances and len(table.distances) == count
+    assert table.distance(board.solved_state) == 0
+    for rank in range(count):
+        assert table.distances[rank] == 0 or table.best_moves[rank] != 255
+    seen = set()
+    queue = [board.solved_int]
+    while queue:
+        state_int = queue.pop()
+        if state_int in seen:
+            continue
+        seen.add(state_int)
+        puzzle.set_state_int(state_int)
+        distance = table.distance(puzzle.state)
+        neighbours = []
+        for move in puzzle.list_valid_moves():
+            child_int = puzzle.peek(move)[0]
+            neighbours.append(table.distance(puzzle.decode(child_int)))
+            queue.append(child_int)
+        if distance:
+            assert min(neighbours) == distance - 1
+        assert max(neighbours) <= distance + 1
+    assert len(seen) == count
+
+def test_distances_match_ida(table):
+    ida = Solver("IDA",trace=False)
+    scrambler = Puzzle()
+    rng = random.Random(8)
+    for i in range(50):
+        scrambler.shuffle(40,rng)
+        assert table.distance(scrambler.state) == len(ida.solve(scrambler.get_state_str()))
+
+def test_walk_solves_in_the_shortest_number_of_moves(table):
+    scrambler = Puzzle()
+    rng = random.Random(9)
+    for i in range(200):
+        scrambler.shuffle(40,rng)
+        puzzle = Puzzle(scrambler.get_state_str())
+        moves = table.solve(puzzle)
+        assert puzzle.is_solved()
+        assert len(moves) == table.distance(scrambler.state)
+        check = Puzzle(scrambler.get_state_str())
+        check.move_sequence(moves,trace=False)
+        assert check.is_solved()
+
+def test_depth_counts(table):
+    counts = table.depth_counts()
+    assert sum(counts) == 181440 # 9!/2
+    assert counts[0] == 1 and len(counts) == 31 # The hardest 8-puzzle takes 30 moves with the spiral goal
+    assert all(count > 0 for count in counts)
+
+def test_save_and_load(tmp_path):
+    board = get_board(2,3)
+    table = StateTable.build(board)
+    path = str(tmp_path/StateTable.file_name(board))
+    table.save(path)
+    assert os.listdir(tmp_path) == [StateTable.file_name(board)] # The temporary file got renamed into place
+    loaded = StateTable.load(board,path)
+    assert loaded.distances == table.distances and loaded.best_moves == table.best_moves
+    assert StateTable.load_or_build(board,path).distances == table.distances
+    with pytest.raises(Exception):
+        StateTable.load(get_board(2,4),path)
+
+def test_load_or_build_saves_the_table(tmp_path):
+    board = get_board(2,3)
+    path = str(tmp_path/"table")
+    built = StateTable.load_or_build(board,path)
+    assert os.path.exists(path)
+    assert StateTable.load(board,path).distances == built.distances
+
+def test_table_solver_is_optimal(table):
+    solver = Solver("TABLE",table=table,trace=False)
+    ida = Solver("IDA",trace=False)
+    scrambler = Puzzle()
+    rng = random.Random(10)
+    for i in range(30):
+        scrambler.shuffle(40,rng)
+        assert len(solver.solve(scrambler.get_state_str())) == len(ida.solve(scrambler.get_state_str()))
+    with pytest.raises(Exception):
+        Solver("TABLE",rows=2,cols=3,table=table)
+
+def test_big_boards_are_rejected():
+    with pytest.raises(Exception):
+        StateTable.build(get_board(4,4))
@@ -0,0 +1,71 @@
+import atexit
+import logging
+
+# Everything the puzzle and the solver log goes through this logger. Nothing sets it up when the modules get imported, so until start_trace_log() is called, logging to it is just a level check that throws the message away.
+TRACE = logging.getLogger("8-puzzle")
+
+LISTENER = None # The QueueListener writing the trace to its file, if start_trace_log() has been called
+
+class LazyQueueHandler(logging.Handler):
+    """
+    A handler that puts the records on a queue as they are, for a QueueListener to handle. logging.handlers.QueueHandler formats every message before queueing it so it can be sent to other processes, which means all the string formatting still happens in the thread doing the logging. Leaving it alone moves that work to the listener's thread. The catch is that the arguments get formatted later, so they can't be things that keep changing (like a Puzzle), which is what PuzzleTrace (in puzzle.py) is for.
+    It's a plain Handler instead of a QueueHandler subclass so that logging.handlers (which pulls in socket, pickle and more) only gets imported once the trace log actually starts.
+    """
+
+    def __init__(self,queue):
+        super().__init__()
+        self.queue = queue
+
+    def emit(self,record):
+        try:
+            self.queue.put_nowait(record)
+        except Exception:
+            self.handleError(record)
+
+class BatchFileHandler(logging.FileHandler):
+    """A FileHandler that doesn't flush the file after every record. The file's own buffer writes them in batches instead, and everything left gets flushed when the handler is closed."""
+
+    def emit(self,record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+def start_trace_log(filename="8-puzzle.log",level=logging.INFO):
+    """Starts writing the trace to a file. The records go through a queue to a listener thread, which formats them and writes them to the file, so the code doing the logging only has to queue them. This replaces the logging.basicConfig() call that used to happen whenever puzzle.py got imported.
+
+    Args:
+        filename (str): File to add the trace to
+        level (int): Lowest level of message that gets written
+    """
+    import queue
+    from logging.handlers import QueueListener
+    global LISTENER
+    stop_trace_log()
+    handler = BatchFileHandler(filename,delay=True)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    records = queue.SimpleQueue()
+    LISTENER = QueueListener(records,handler)
+    TRACE.addHandler(LazyQueueHandler(records))
+    TRACE.setLevel(level)
+    TRACE.propagate = False
+    LISTENER.start()
+
+def stop_trace_log():
+    """Writes out everything still in the queue, closes the file and stops the trace. This happens automatically when the program exits."""
+    global LISTENER
+    if LISTENER is None:
+        return
+    for handler in list(TRACE.handlers):
+        if isinstance(handler,LazyQueueHandler):
+            TRACE.removeHandler(handler)
+    LISTENER.stop()
+    for handler in LISTENER.handlers:
+        handler.close()
+    LISTENER = None
+    TRACE.setLevel(logging.NOTSET)
+    TRACE.propagate = True
+
+atexit.register(stop_trace_log)